@@ -28,6 +28,7 @@ DEFAULT_SETTINGS = {
     'batch_max_requests': 25,
     'cache_backend': '',
     'cache_pool_size': 10,
+    'cache_pool_timeout': 10,
     'cache_url': '',
     'cors_origins': '*',
     'cors_max_age_seconds': 3600,
@@ -45,6 +46,7 @@ DEFAULT_SETTINGS = {
         'cliquet.initialization.setup_storage',
         'cliquet.initialization.setup_permission',
         'cliquet.initialization.setup_cache',
+        'cliquet.initialization.setup_transaction',
         'cliquet.initialization.setup_requests_scheme',
         'cliquet.initialization.setup_trailing_slash_redirection',
         'cliquet.initialization.setup_version_redirection',
@@ -53,6 +55,7 @@ DEFAULT_SETTINGS = {
         'cliquet.initialization.setup_backoff',
         'cliquet.initialization.setup_statsd'
     ),
+    'json_passthrough_enabled': False,
     'logging_renderer': 'cliquet.logs.ClassicLogRenderer',
     'newrelic_config': None,
     'newrelic_env': 'dev',
@@ -60,6 +63,7 @@ DEFAULT_SETTINGS = {
     'permission_backend': '',
     'permission_url': '',
     'permission_pool_size': 10,
+    'permission_pool_timeout': 10,
     'profiler_dir': '/tmp',
     'profiler_enabled': False,
     'project_docs': '',
@@ -69,11 +73,25 @@ DEFAULT_SETTINGS = {
     'statsd_prefix': 'cliquet',
     'statsd_url': None,
     'storage_backend': '',
+    'storage_delete_batch_size': 0,
+    'storage_deleted_partition_interval': 'month',
+    'storage_fsync_interval_ms': 1000,
     'storage_max_fetch_size': 10000,
+    'storage_notifications_enabled': False,
+    'storage_path': '',
     'storage_pool_size': 10,
+    'storage_pool_timeout': 10,
+    'storage_prepared_statements': True,
+    'storage_replica_max_lag': 5,
+    'storage_replica_urls': '',
+    'storage_request_timeout_ms': 0,
+    'storage_shard_urls': '',
+    'storage_snapshot_threshold': 10000,
+    'storage_statement_timeout_ms': 0,
     'storage_url': '',
     'userid_hmac_secret': '',
     'version_prefix_redirect_enabled': True,
+    'transaction_per_request': False,
     'trailing_slash_redirect_enabled': True,
     'multiauth.policies': 'basicauth',
     'multiauth.policy.basicauth.use': ('cliquet.authentication.'
@@ -123,6 +123,7 @@ def load_from_config(config):
     uri = settings['cache_url']
     uri = urlparse.urlparse(uri)
     pool_size = int(settings['cache_pool_size'])
+    pool_timeout = settings.get('cache_pool_timeout')
 
     conn_kwargs = dict(pool_size=pool_size,
                        host=uri.hostname,
@@ -133,4 +134,7 @@ def load_from_config(config):
     # Filter specified values only, to preserve PostgreSQL defaults
     conn_kwargs = dict([(k, v) for k, v in conn_kwargs.items() if v])
 
+    if pool_timeout is not None:
+        conn_kwargs['pool_timeout'] = float(pool_timeout)
+
     return PostgreSQL(**conn_kwargs)
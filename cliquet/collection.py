@@ -49,7 +49,8 @@ class Collection(object):
             auth=self.auth)
 
     def get_records(self, filters=None, sorting=None, pagination_rules=None,
-                    limit=None, include_deleted=False, parent_id=None):
+                    limit=None, include_deleted=False, parent_id=None,
+                    raw=False):
         """Fetch the collection records.
 
         Override to post-process records after feching them from storage.
@@ -80,6 +81,10 @@ class Collection(object):
 
         :param str parent_id: optional filter for parent id
 
+        :param bool raw: Optionnally obtain records as
+            :class:`cliquet.utils.RawJSON` strings, if supported by the
+            storage backend.
+
         :returns: A tuple with the list of records in the current page,
             the total number of records in the result set.
         :rtype: tuple
@@ -96,7 +101,8 @@ class Collection(object):
             id_field=self.id_field,
             modified_field=self.modified_field,
             deleted_field=self.deleted_field,
-            auth=self.auth)
+            auth=self.auth,
+            raw=raw)
         return records, total_records
 
     def delete_records(self, filters=None, parent_id=None):
@@ -171,6 +177,30 @@ class Collection(object):
                                    modified_field=self.modified_field,
                                    auth=self.auth)
 
+    def create_records(self, records, parent_id=None, unique_fields=None):
+        """Create several records in the collection, in bulk.
+
+        Use it instead of :meth:`create_record` to import many records
+        (e.g. from scripts). Note that it does not call
+        :meth:`create_record`, hence its overrides.
+
+        :param list records: records to store
+        :param str parent_id: optional filter for parent id
+        :param tuple unique_fields: list of fields that should remain unique
+
+        :returns: the list of newly created records.
+        :rtype: list
+        """
+        parent_id = parent_id or self.parent_id
+        return self.storage.create_many(collection_id=self.collection_id,
+                                        parent_id=parent_id,
+                                        records=records,
+                                        id_generator=self.id_generator,
+                                        unique_fields=unique_fields,
+                                        id_field=self.id_field,
+                                        modified_field=self.modified_field,
+                                        auth=self.auth)
+
     def update_record(self, record, parent_id=None, unique_fields=None):
         """Update a record in the collection.
 
@@ -204,6 +234,28 @@ class Collection(object):
                                    modified_field=self.modified_field,
                                    auth=self.auth)
 
+    def update_records(self, records, parent_id=None, unique_fields=None):
+        """Update several records in the collection, in bulk.
+
+        Like :meth:`create_records`, it does not call
+        :meth:`update_record`, hence its overrides.
+
+        :param list records: records to store, with their ids
+        :param str parent_id: optional filter for parent id
+        :param tuple unique_fields: list of fields that should remain unique
+
+        :returns: the list of updated records.
+        :rtype: list
+        """
+        parent_id = parent_id or self.parent_id
+        return self.storage.update_many(collection_id=self.collection_id,
+                                        parent_id=parent_id,
+                                        records=records,
+                                        unique_fields=unique_fields,
+                                        id_field=self.id_field,
+                                        modified_field=self.modified_field,
+                                        auth=self.auth)
+
     def delete_record(self, record, parent_id=None):
         """Delete a record in the collection.
 
@@ -256,6 +308,30 @@ class ProtectedCollection(Collection):
                                              'write',
                                              self.current_principal)
 
+    def _set_permissions(self, record, permissions):
+        """Helper to replace the permissions of the record, give the
+        ``write`` permission to the current user, and add them to the record.
+        """
+        record = record.copy()
+        record_id = record[self.id_field]
+        perm_object_id = self.get_permission_object_id(record_id)
+        self.permission.replace_object_permissions(perm_object_id, permissions)
+        self._allow_write(perm_object_id)
+        permissions = self.permission.object_permissions(perm_object_id)
+        record[self.permissions_field] = permissions
+        return record
+
+    def _pop_permissions(self, records):
+        """Helper to split the records from their specified permissions.
+        """
+        stripped = []
+        permissions = []
+        for record in records:
+            record = record.copy()
+            permissions.append(record.pop(self.permissions_field, {}))
+            stripped.append(record)
+        return stripped, permissions
+
     def delete_records(self, filters=None, parent_id=None):
         """Delete permissions when collection records are deleted in bulk.
         """
@@ -285,14 +361,29 @@ class ProtectedCollection(Collection):
         record = super(ProtectedCollection, self).create_record(
             record, parent_id, unique_fields)
 
-        record_id = record[self.id_field]
-        perm_object_id = self.get_permission_object_id(record_id)
-        self.permission.replace_object_permissions(perm_object_id, permissions)
-        self._allow_write(perm_object_id)
-        permissions = self.permission.object_permissions(perm_object_id)
-        record[self.permissions_field] = permissions
+        return self._set_permissions(record, permissions)
 
-        return record
+    def create_records(self, records, parent_id=None, unique_fields=None):
+        """Create records in bulk and set their specified permissions.
+
+        The current principal is added to the owners (``write`` permission).
+        """
+        records, permissions = self._pop_permissions(records)
+        records = super(ProtectedCollection, self).create_records(
+            records, parent_id, unique_fields)
+        return [self._set_permissions(record, perms)
+                for record, perms in zip(records, permissions)]
+
+    def update_records(self, records, parent_id=None, unique_fields=None):
+        """Update records in bulk and their specified permissions.
+
+        The current principal is added to the owners (``write`` permission).
+        """
+        records, permissions = self._pop_permissions(records)
+        records = super(ProtectedCollection, self).update_records(
+            records, parent_id, unique_fields)
+        return [self._set_permissions(record, perms)
+                for record, perms in zip(records, permissions)]
 
     def update_record(self, record, parent_id=None, unique_fields=None):
         """Update record and the specified permissions.
@@ -306,14 +397,7 @@ class ProtectedCollection(Collection):
         record = super(ProtectedCollection, self).update_record(
             record, parent_id, unique_fields)
 
-        record_id = record[self.id_field]
-        perm_object_id = self.get_permission_object_id(record_id)
-        self.permission.replace_object_permissions(perm_object_id, permissions)
-        self._allow_write(perm_object_id)
-        permissions = self.permission.object_permissions(perm_object_id)
-        record[self.permissions_field] = permissions
-
-        return record
+        return self._set_permissions(record, permissions)
 
     def delete_record(self, record_id, parent_id=None):
         """Delete record and its associated permissions.
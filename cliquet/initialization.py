@@ -21,6 +21,7 @@ from cliquet import errors
 from cliquet import logger
 from cliquet import utils
 from cliquet import statsd
+from cliquet.storage.postgresql import PostgreSQLClient
 
 from pyramid.events import NewRequest, NewResponse
 from pyramid.httpexceptions import HTTPTemporaryRedirect, HTTPGone
@@ -28,6 +29,7 @@ from pyramid.renderers import JSON as JSONRenderer
 from pyramid.security import NO_PERMISSION_REQUIRED
 from pyramid.interfaces import IAuthenticationPolicy
 from pyramid.settings import asbool
+from pyramid.tweens import EXCVIEW
 from pyramid_multiauth import MultiAuthPolicySelected
 
 
@@ -46,8 +48,8 @@ def setup_json_serializer(config):
     webob.request.json = utils.json
     requests.models.json = utils.json
 
-    # Override json renderer using ujson
-    renderer = JSONRenderer(serializer=lambda v, **kw: utils.json.dumps(v))
+    # Override json renderer using ujson, and write raw JSON records as is.
+    renderer = JSONRenderer(serializer=utils.json_serializer)
     config.add_renderer('json', renderer)
 
 
@@ -175,6 +177,31 @@ def setup_requests_scheme(config):
         config.add_subscriber(on_new_request, NewRequest)
 
 
+def setup_transaction(config):
+    settings = config.get_settings()
+    if not asbool(settings['transaction_per_request']):
+        return
+    # Only PostgreSQL backends run within the request transaction.
+    backends = [getattr(config.registry, name, None)
+                for name in ('storage', 'cache', 'permission')]
+    for backend in list(backends):
+        backends.extend(getattr(backend, 'shards', []))
+    if any([isinstance(backend, PostgreSQLClient) for backend in backends]):
+        config.add_tween("cliquet.initialization._transaction_tween_factory",
+                         under=EXCVIEW)
+
+
+def _transaction_tween_factory(handler, registry):
+    """Pyramid tween to run the whole request in a single transaction for
+    each PostgreSQL database, committed at the end or rolled back on error.
+    """
+    def transaction_tween(request):
+        with PostgreSQLClient.transaction():
+            return handler(request)
+
+    return transaction_tween
+
+
 def setup_deprecation(config):
     config.add_tween("cliquet.initialization._end_of_life_tween_factory")
 
@@ -208,6 +235,38 @@ def _end_of_life_tween_factory(handler, registry):
     return eos_tween
 
 
+def _connection_pool(backend):
+    """Return the connection pool of the specified backend, if it manages
+    one (e.g. PostgreSQL).
+    """
+    pool = getattr(backend, 'pool', None)
+    if pool is not None and hasattr(pool, 'stats'):
+        return pool
+
+
+def _watch_connection_pool(config, name):
+    """Report in the heartbeat whether the backend pool is exhausted
+    (e.g. ``storage_pool``), and log its usage figures.
+
+    Every connection being in use is expected under load: the pool is only
+    considered exhausted if some checkouts timed out since the last probe.
+    """
+    pool = _connection_pool(getattr(config.registry, name))
+    if pool is None:
+        return
+
+    last_probe = {'timeouts': pool.stats()['timeouts']}
+
+    def pool_heartbeat(request):
+        stats = pool.stats()
+        logger.info('%s.pool' % name, **stats)
+        timed_out = stats['timeouts'] > last_probe['timeouts']
+        last_probe['timeouts'] = stats['timeouts']
+        return not timed_out
+
+    config.registry.heartbeats['%s_pool' % name] = pool_heartbeat
+
+
 def setup_storage(config):
     settings = config.get_settings()
     storage_class = settings['storage_backend']
@@ -217,6 +276,7 @@ def setup_storage(config):
     storage = config.maybe_dotted(storage_class)
     config.registry.storage = storage.load_from_config(config)
     config.registry.heartbeats['storage'] = config.registry.storage.ping
+    _watch_connection_pool(config, 'storage')
     id_generator = config.maybe_dotted(settings['id_generator'])
     config.registry.id_generator = id_generator()
 
@@ -230,6 +290,7 @@ def setup_permission(config):
     permission = config.maybe_dotted(permission_class)
     config.registry.permission = permission.load_from_config(config)
     config.registry.heartbeats['permission'] = config.registry.permission.ping
+    _watch_connection_pool(config, 'permission')
 
 
 def setup_cache(config):
@@ -241,6 +302,7 @@ def setup_cache(config):
     cache = config.maybe_dotted(cache_class)
     config.registry.cache = cache.load_from_config(config)
     config.registry.heartbeats['cache'] = config.registry.cache.ping
+    _watch_connection_pool(config, 'cache')
 
 
 def setup_statsd(config):
@@ -257,6 +319,12 @@ def setup_statsd(config):
         client.watch_execution_time(config.registry.permission,
                                     prefix='permission')
 
+        pools = {}
+        for name in ('cache', 'storage', 'permission'):
+            pool = _connection_pool(getattr(config.registry, name, None))
+            if pool is not None:
+                pools[name] = pool
+
         # Commit so that configured policy can be queried.
         config.commit()
         policy = config.registry.queryUtility(IAuthenticationPolicy)
@@ -265,6 +333,14 @@ def setup_statsd(config):
         def on_new_response(event):
             request = event.request
 
+            # Report connection pools usage.
+            for name, pool in pools.items():
+                stats = pool.stats()
+                for key in ('in_use', 'waits', 'timeouts'):
+                    client.gauge('%s.pool.%s' % (name, key), stats[key])
+                max_wait = int(stats['max_wait'] * 1000)
+                client.gauge('%s.pool.max_wait' % name, max_wait)
+
             # Count unique users.
             user_id = request.authenticated_userid
             if user_id:
@@ -313,6 +313,7 @@ def load_from_config(config):
     uri = settings['permission_url']
     uri = urlparse.urlparse(uri)
     pool_size = int(settings['permission_pool_size'])
+    pool_timeout = settings.get('permission_pool_timeout')
 
     conn_kwargs = dict(pool_size=pool_size,
                        host=uri.hostname,
@@ -323,4 +324,7 @@ def load_from_config(config):
     # Filter specified values only, to preserve PostgreSQL defaults
     conn_kwargs = dict([(k, v) for k, v in conn_kwargs.items() if v])
 
+    if pool_timeout is not None:
+        conn_kwargs['pool_timeout'] = float(pool_timeout)
+
     return PostgreSQL(**conn_kwargs)
@@ -6,6 +6,7 @@ import venusian
 import six
 from pyramid.httpexceptions import (HTTPNotModified, HTTPPreconditionFailed,
                                     HTTPNotFound, HTTPConflict)
+from pyramid.settings import asbool
 
 from cliquet import logger
 from cliquet import Service
@@ -16,7 +17,7 @@ from cliquet.schema import ResourceSchema
 from cliquet.storage import exceptions as storage_exceptions, Filter, Sort
 from cliquet.utils import (
     COMPARISON, classname, native_value, decode64, encode64, json,
-    current_service, encode_header, decode_header
+    current_service, encode_header, decode_header, RawJSON
 )
 
 
@@ -207,16 +208,25 @@ class BaseResource(object):
         pagination_rules = self._extract_pagination_rules_from_token(
             limit, sorting)
 
+        options = {}
+        if self._is_json_passthrough_enabled():
+            # Records are written in the response as they come from storage.
+            options['raw'] = True
+
         records, total_records = self.collection.get_records(
             filters=filters,
             sorting=sorting,
             limit=limit,
             pagination_rules=pagination_rules,
-            include_deleted=include_deleted)
+            include_deleted=include_deleted,
+            **options)
 
         next_page = None
         if limit and len(records) == limit and total_records > limit:
-            next_page = self._next_page_url(sorting, limit, records[-1])
+            last_record = records[-1]
+            if isinstance(last_record, RawJSON):
+                last_record = json.loads(last_record)
+            next_page = self._next_page_url(sorting, limit, last_record)
             headers['Next-Page'] = encode_header(next_page)
 
         # Bind metric about response size.
@@ -551,6 +561,19 @@ class BaseResource(object):
     # Internals
     #
 
+    def _is_json_passthrough_enabled(self):
+        """Return ``True`` if records can be obtained as raw JSON strings
+        from storage, i.e. if enabled in settings and if the collection does
+        not override :meth:`cliquet.collection.Collection.get_records` to
+        post-process them.
+        """
+        settings = self.request.registry.settings
+        if not asbool(settings['json_passthrough_enabled']):
+            return False
+        get_records = six.get_unbound_function(
+            type(self.collection).get_records)
+        return get_records is six.get_unbound_function(Collection.get_records)
+
     def _get_record_or_404(self, record_id):
         """Retrieve record from storage and raise ``404 Not found`` if missing.
 
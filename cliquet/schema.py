@@ -24,7 +24,9 @@ class ResourceSchema(colander.MappingSchema):
         unique_fields = tuple()
         """Fields that must have unique values for the user collection.
         During records creation and modification, a conflict error will be
-        raised if unicity is about to be violated.
+        raised if unicity is about to be violated. When supported by the
+        storage backend, unique indexes will be created by the
+        ``cliquet migrate`` command to enforce it.
         """
 
         readonly_fields = tuple()
@@ -47,6 +49,14 @@ class ResourceSchema(colander.MappingSchema):
                 class Options:
                     preserve_unknown = True
         """
+
+        indexed_fields = tuple()
+        """Fields that are frequently used for filtering or sorting the records
+        of the collection. When supported by the storage backend, indexes will
+        be created (or dropped when fields are removed from this list) by the
+        ``cliquet migrate`` command.
+        """
+
     def get_option(self, attr):
         default_value = getattr(ResourceSchema.Options, attr)
         return getattr(self.Options, attr,  default_value)
@@ -6,6 +6,9 @@ import warnings
 
 from pyramid.paster import bootstrap
 
+from cliquet.storage import collections_option
+from cliquet.utils import msec_time
+
 
 def deprecated_init(env):
     message = '"cliquet init" is deprecated. Use "cliquet migrate" instead.'
@@ -20,6 +23,24 @@ def init_schema(env):
         if hasattr(registry, backend):
             getattr(registry, backend).initialize_schema()
 
+    if hasattr(registry, 'storage'):
+        registry.storage.initialize_indexes(
+            collections_option(registry, 'indexed_fields'),
+            unique_fields=collections_option(registry, 'unique_fields'))
+
+
+def expire_deleted(env, days):
+    """Delete the tombstones older than the specified number of days."""
+    registry = env['registry']
+    before = msec_time() - days * 24 * 3600 * 1000
+    registry.storage.expire_deleted(before=before)
+
+
+def rebalance_shards(env, parent_id=None):
+    """Move the records of parents to the shard they are routed to."""
+    registry = env['registry']
+    registry.storage.rebalance(parent_id=parent_id)
+
 
 def main():
     description = """\
@@ -39,6 +60,19 @@ def main():
     parser_deprecated_init.set_defaults(func=deprecated_init)
     parser_init_schema = subparsers.add_parser('migrate')
     parser_init_schema.set_defaults(func=init_schema)
+    parser_expire_deleted = subparsers.add_parser('expire-deleted')
+    parser_expire_deleted.add_argument('--days',
+                                       help='Age of the tombstones to delete',
+                                       type=int,
+                                       required=True)
+    parser_expire_deleted.set_defaults(
+        func=lambda env: expire_deleted(env, args.days))
+    parser_rebalance_shards = subparsers.add_parser('rebalance-shards')
+    parser_rebalance_shards.add_argument('--parent-id',
+                                         help='Move this parent only',
+                                         dest='parent_id')
+    parser_rebalance_shards.set_defaults(
+        func=lambda env: rebalance_shards(env, args.parent_id))
 
     args = parser.parse_args(sys.argv[1:])
 
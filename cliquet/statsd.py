@@ -27,6 +27,9 @@ class Client(object):
     def timer(self, key):
         return self._client.timer(key)
 
+    def gauge(self, key, value):
+        return self._client.gauge(key, value)
+
     def count(self, key, unique=None):
         if unique is None:
             return self._client.incr(key, count=1)
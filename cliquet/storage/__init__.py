@@ -43,6 +43,21 @@ class StorageBase(object):
         """
         raise NotImplementedError
 
+    def initialize_indexes(self, indexed_fields, unique_fields=None):
+        """Create the indices that speed up filtering and sorting on the
+        specified record fields, and remove the ones that are not specified
+        anymore.
+
+        This is excuted when the ``cliquet migrate`` command is ran. By
+        default, backends have nothing to do.
+
+        :param dict indexed_fields: the list of record fields to index,
+            by collection id.
+        :param dict unique_fields: the list of record fields whose values
+            must be unique, by collection id.
+        """
+        pass
+
     def flush(self, auth=None):
         """Remove **every** object from this storage.
         """
@@ -108,6 +123,40 @@ class StorageBase(object):
         """
         raise NotImplementedError
 
+    def create_many(self, collection_id, parent_id, records,
+                    id_generator=None, unique_fields=None,
+                    id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        """Create the specified `records` in this `collection_id` for this
+        `parent_id`, in bulk.
+
+        By default, objects are created one by one with :meth:`create`.
+        Backends should override it to reduce the cost of each creation.
+
+        .. note::
+
+            This will update the collection timestamp, which is strictly
+            increasing within the objects of the batch.
+
+        :raises: :exc:`cliquet.storage.exceptions.UnicityError`
+
+        :param str collection_id: the collection id.
+        :param str parent_id: the collection parent.
+
+        :param list records: the list of objects to create.
+
+        :returns: the list of newly created objects, in the same order.
+        :rtype: list
+        """
+        return [self.create(collection_id, parent_id, record,
+                            id_generator=id_generator,
+                            unique_fields=unique_fields,
+                            id_field=id_field,
+                            modified_field=modified_field,
+                            auth=auth)
+                for record in records]
+
     def get(self, collection_id, parent_id, object_id,
             id_field=DEFAULT_ID_FIELD,
             modified_field=DEFAULT_MODIFIED_FIELD,
@@ -153,6 +202,40 @@ class StorageBase(object):
         """
         raise NotImplementedError
 
+    def update_many(self, collection_id, parent_id, records,
+                    unique_fields=None, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        """Overwrite the specified `records`, in bulk. Each object must
+        have its id in the `id_field` attribute.
+
+        Objects that are not found are created with their specified id.
+
+        By default, objects are updated one by one with :meth:`update`.
+        Backends should override it to reduce the cost of each update.
+
+        .. note::
+
+            This will update the collection timestamp, which is strictly
+            increasing within the objects of the batch.
+
+        :raises: :exc:`cliquet.storage.exceptions.UnicityError`
+
+        :param str collection_id: the collection id.
+        :param str parent_id: the collection parent.
+
+        :param list records: the list of objects to update or create.
+
+        :returns: the list of updated objects, in the same order.
+        :rtype: list
+        """
+        return [self.update(collection_id, parent_id, record[id_field], record,
+                            unique_fields=unique_fields,
+                            id_field=id_field,
+                            modified_field=modified_field,
+                            auth=auth)
+                for record in records]
+
     def delete(self, collection_id, parent_id, object_id,
                with_deleted=True, id_field=DEFAULT_ID_FIELD,
                modified_field=DEFAULT_MODIFIED_FIELD,
@@ -219,12 +302,23 @@ class StorageBase(object):
         """
         raise NotImplementedError
 
+    def expire_deleted(self, before, auth=None):
+        """Delete the deleted object tombstones of every collection that
+        are older than `before`.
+
+        Backends may keep tombstones slightly longer than requested, when
+        they are expired in batches (e.g. by periods of time).
+
+        :param int before: timestamp to limit deletion (exclusive)
+        """
+        raise NotImplementedError
+
     def get_all(self, collection_id, parent_id, filters=None, sorting=None,
                 pagination_rules=None, limit=None, include_deleted=False,
                 id_field=DEFAULT_ID_FIELD,
                 modified_field=DEFAULT_MODIFIED_FIELD,
                 deleted_field=DEFAULT_DELETED_FIELD,
-                auth=None):
+                auth=None, raw=False):
         """Retrieve all objects in this `collection_id` for this `parent_id`.
 
         :param str collection_id: the collection id.
@@ -254,8 +348,65 @@ class StorageBase(object):
         :param bool include_deleted: Optionnally include the deleted objects
             that match the filters.
 
+        :param bool raw: Optionnally return the objects as
+            :class:`cliquet.utils.RawJSON` strings instead of dicts, if
+            supported by the backend.
+
         :returns: the limited list of objects, and the total number of
             matching objects in the collection (deleted ones excluded).
         :rtype: tuple (list, integer)
         """
         raise NotImplementedError
+
+    def iter_all(self, collection_id, parent_id, filters=None, sorting=None,
+                 include_deleted=False, id_field=DEFAULT_ID_FIELD,
+                 modified_field=DEFAULT_MODIFIED_FIELD,
+                 deleted_field=DEFAULT_DELETED_FIELD,
+                 auth=None):
+        """Iterate over the objects in this `collection_id` for this
+        `parent_id`, without limit on their number.
+
+        Unlike :meth:`get_all`, objects are yielded as they are fetched
+        from the backend, allowing to walk large collections (e.g. exports
+        or maintenance jobs) with bounded memory.
+
+        :param str collection_id: the collection id.
+        :param str parent_id: the collection parent.
+
+        :param filters: Optionally filter the objects by their attribute.
+            Each filter in this list is a tuple of a field, a value and a
+            comparison (see `cliquet.utils.COMPARISON`). All filters
+            are combined using *AND*.
+        :type filters: list of :class:`cliquet.storage.Filter`
+
+        :param sorting: Optionnally sort the objects by attribute.
+            Each sort instruction in this list refers to a field and a
+            direction (negative means descending). All sort instructions are
+            cumulative.
+        :type sorting: list of :class:`cliquet.storage.Sort`
+
+        :param bool include_deleted: Optionnally include the deleted objects
+            that match the filters.
+
+        :returns: an iterator over the objects.
+        :rtype: generator
+        """
+        raise NotImplementedError
+
+
+def collections_option(registry, option):
+    """Return the fields declared in the specified schema option (e.g.
+    ``indexed_fields``) of every registered resource, by collection id.
+    """
+    collections = {}
+    services = getattr(registry, 'cornice_services', {})
+    for service in services.values():
+        resource = getattr(service, 'resource', None)
+        if resource is None or service.type != 'collection':
+            continue
+        # Collection id is the resource class name (see BaseResource).
+        collection_id = resource.__name__.lower()
+        fields = resource.mapping.get_option(option)
+        if fields:
+            collections[collection_id] = tuple(fields)
+    return collections
@@ -16,6 +16,13 @@ class BackendError(Exception):
         super(BackendError, self).__init__(message, *args, **kwargs)
 
 
+class BackendTimeout(BackendError):
+    """A storage exception raised when an operation took longer than allowed
+    (e.g. ``storage_statement_timeout_ms``).
+    """
+    pass
+
+
 class RecordNotFoundError(Exception):
     """An exception raised when a specific record could not be found.
 
@@ -1,9 +1,17 @@
+import bisect
+import contextlib
+import functools
+import heapq
 import operator
+import threading
 from collections import defaultdict
 
+import six
+from pyramid.events import ApplicationCreated
+
 from cliquet import utils
 from cliquet.storage import (
-    StorageBase, exceptions, Filter,
+    StorageBase, exceptions, Filter, collections_option,
     DEFAULT_ID_FIELD, DEFAULT_MODIFIED_FIELD, DEFAULT_DELETED_FIELD)
 from cliquet.utils import COMPARISON
 
@@ -40,6 +48,23 @@ class MemoryBasedStorage(StorageBase):
                    for r in records]
         return deleted
 
+    def iter_all(self, collection_id, parent_id, filters=None, sorting=None,
+                 include_deleted=False, id_field=DEFAULT_ID_FIELD,
+                 modified_field=DEFAULT_MODIFIED_FIELD,
+                 deleted_field=DEFAULT_DELETED_FIELD,
+                 auth=None):
+        # Records are filtered and sorted in memory anyway.
+        records, _ = self.get_all(collection_id, parent_id,
+                                  filters=filters,
+                                  sorting=sorting,
+                                  include_deleted=include_deleted,
+                                  id_field=id_field,
+                                  modified_field=modified_field,
+                                  deleted_field=deleted_field,
+                                  auth=auth)
+        for record in records:
+            yield record
+
     def strip_deleted_record(self, resource, parent_id, record,
                              id_field=DEFAULT_ID_FIELD,
                              modified_field=DEFAULT_MODIFIED_FIELD,
@@ -84,36 +109,59 @@ class MemoryBasedStorage(StorageBase):
                 field = filters[0].field
                 raise exceptions.UnicityError(field, existing[0])
 
-    def apply_filters(self, records, filters):
-        """Filter the specified records, using basic iteration.
+    def check_unicity_many(self, collection_id, parent_id, records,
+                           unique_fields, id_field, for_creation=False):
+        """Check that the specified records do not violate unicity
+        constraints, neither with existing records nor with each other.
+
+        Existing records are fetched only once for the whole batch.
         """
-        operators = {
-            COMPARISON.LT: operator.lt,
-            COMPARISON.MAX: operator.le,
-            COMPARISON.EQ: operator.eq,
-            COMPARISON.NOT: operator.ne,
-            COMPARISON.MIN: operator.ge,
-            COMPARISON.GT: operator.gt,
-            COMPARISON.IN: operator.contains,
-            COMPARISON.EXCLUDE: lambda x, y: not operator.contains(x, y),
-        }
+        if for_creation:
+            # Ids provided by client must not conflict either.
+            unique_fields = (unique_fields or tuple()) + (id_field,)
+
+        if not unique_fields:
+            return
+
+        unique_fields = set(unique_fields)
+
+        def unique_values(record):
+            for field in unique_fields:
+                value = record.get(field)
+                # None values cannot be considered unique.
+                if value is not None:
+                    yield field, utils.json.dumps(value)
+
+        existing, _ = self.get_all(collection_id, parent_id,
+                                   id_field=id_field)
+        known = {}
+        for record in existing:
+            for key in unique_values(record):
+                known[key] = record
 
         for record in records:
-            matches = True
-            for f in filters:
-                left = record.get(f.field)
-                right = f.value
-                if f.operator in (COMPARISON.IN, COMPARISON.EXCLUDE):
-                    right = left
-                    left = f.value
-                matches = matches and operators[f.operator](left, right)
-            if matches:
-                yield record
-
-    def apply_sorting(self, records, sorting):
-        """Sort the specified records, using cumulative python sorting.
+            for key in unique_values(record):
+                other = known.get(key)
+                if other is None:
+                    continue
+                is_itself = other[id_field] == record[id_field]
+                if for_creation or not is_itself:
+                    field, _ = key
+                    raise exceptions.UnicityError(field, other)
+            for key in unique_values(record):
+                known[key] = record
+
+    def apply_filters(self, records, filters):
+        """Filter the specified records, using a compiled predicate.
         """
-        return apply_sorting(records, sorting)
+        matches = compile_filters(filters)
+        return (record for record in records if matches(record))
+
+    def apply_sorting(self, records, sorting, limit=None):
+        """Sort the specified records, using a composite key, and keep only
+        the first `limit` ones if specified.
+        """
+        return apply_sorting(records, sorting, limit=limit)
 
     def extract_record_set(self, collection_id, records,
                            filters, sorting, id_field, deleted_field,
@@ -121,29 +169,218 @@ class MemoryBasedStorage(StorageBase):
         """Take the list of records and handle filtering, sorting and
         pagination.
 
+        Records are filtered, paginated and counted in a single pass.
         """
-        filtered = list(self.apply_filters(records, filters or []))
-        total_records = len(filtered)
+        matches = compile_filters(filters or [])
+        paginates = None
+        if pagination_rules:
+            paginates = compile_pagination_rules(pagination_rules)
 
-        paginated = {}
-        for rule in pagination_rules or []:
-            values = list(self.apply_filters(filtered, rule))
-            paginated.update(dict(((x[id_field], x) for x in values)))
+        total_records = 0
+        paginated = []
+        for record in records:
+            if not matches(record):
+                continue
+            if record.get(deleted_field) is not True:
+                total_records += 1
+            if paginates is None or paginates(record):
+                paginated.append(record)
 
-        if paginated:
-            paginated = paginated.values()
-        else:
-            paginated = filtered
+        sorted_ = self.apply_sorting(paginated, sorting or [], limit=limit)
 
-        sorted_ = self.apply_sorting(paginated, sorting or [])
+        return sorted_, total_records
 
-        filtered_deleted = len([r for r in sorted_
-                                if r.get(deleted_field) is True])
 
-        if limit:
-            sorted_ = list(sorted_)[:limit]
+class FieldIndex(object):
+    """Secondary index of the values of a record field, in a collection.
 
-        return sorted_, total_records - filtered_deleted
+    Record ids are looked up by value in a hash map for equality filters,
+    and in sorted arrays with bisect for range filters. Range filters can
+    only be answered if every record has a value of the same kind as the
+    filter (i.e. numbers or strings), since mixed values are not ordered.
+    """
+    def __init__(self, field):
+        self.field = field
+        self._values = {}
+        self._ids_by_value = defaultdict(set)
+        self._sorted = {'number': ([], []), 'string': ([], [])}
+        self._others = set()
+
+    @staticmethod
+    def _kind(value):
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, six.integer_types + (float,)):
+            return 'number'
+        if isinstance(value, six.string_types):
+            return 'string'
+        return None
+
+    def add_many(self, records):
+        """Index the specified records, given as ``(id, record)`` items,
+        sorting the arrays only once.
+        """
+        added = defaultdict(list)
+        for record_id, record in records:
+            value = record.get(self.field)
+            self._values[record_id] = value
+            try:
+                self._ids_by_value[value].add(record_id)
+            except TypeError:
+                pass
+            kind = self._kind(value)
+            if kind is None:
+                self._others.add(record_id)
+            else:
+                added[kind].append((value, record_id))
+
+        for kind, items in added.items():
+            keys, ids = self._sorted[kind]
+            items.extend(zip(keys, ids))
+            items.sort(key=operator.itemgetter(0))
+            self._sorted[kind] = ([k for k, _ in items], [i for _, i in items])
+
+    def add(self, record_id, record):
+        value = record.get(self.field)
+        self._values[record_id] = value
+        try:
+            self._ids_by_value[value].add(record_id)
+        except TypeError:
+            pass  # Unhashable values cannot be equal to filters values.
+
+        kind = self._kind(value)
+        if kind is None:
+            self._others.add(record_id)
+            return
+        keys, ids = self._sorted[kind]
+        position = bisect.bisect_right(keys, value)
+        keys.insert(position, value)
+        ids.insert(position, record_id)
+
+    def remove(self, record_id):
+        value = self._values.pop(record_id)
+        try:
+            same_value = self._ids_by_value[value]
+            same_value.discard(record_id)
+            if not same_value:
+                del self._ids_by_value[value]
+        except TypeError:
+            pass
+
+        kind = self._kind(value)
+        if kind is None:
+            self._others.discard(record_id)
+            return
+        keys, ids = self._sorted[kind]
+        start = bisect.bisect_left(keys, value)
+        end = bisect.bisect_right(keys, value)
+        position = start + ids[start:end].index(record_id)
+        del keys[position]
+        del ids[position]
+
+    def lookup(self, filter_):
+        """Return the ids of the records that match the specified filter, or
+        ``None`` if it cannot be answered with this index.
+
+        :rtype: set
+        """
+        try:
+            if filter_.operator == COMPARISON.EQ:
+                return set(self._ids_by_value.get(filter_.value, ()))
+            if filter_.operator == COMPARISON.IN:
+                ids = set()
+                for value in filter_.value:
+                    ids.update(self._ids_by_value.get(value, ()))
+                return ids
+        except TypeError:
+            return None  # Unhashable filter value.
+
+        kind = self._kind(filter_.value)
+        other_kinds = [k for k, (keys, _) in self._sorted.items()
+                       if k != kind and keys]
+        if kind is None or self._others or other_kinds:
+            return None
+
+        keys, ids = self._sorted[kind]
+        value = filter_.value
+        if filter_.operator == COMPARISON.LT:
+            return set(ids[:bisect.bisect_left(keys, value)])
+        if filter_.operator == COMPARISON.MAX:
+            return set(ids[:bisect.bisect_right(keys, value)])
+        if filter_.operator == COMPARISON.GT:
+            return set(ids[bisect.bisect_right(keys, value):])
+        if filter_.operator == COMPARISON.MIN:
+            return set(ids[bisect.bisect_left(keys, value):])
+        return None
+
+
+class ReadWriteLock(object):
+    """Lock that can be held by several readers, or by a single writer.
+
+    Writers waiting for the lock have priority over new readers. The lock
+    is re-entrant: a thread can read or write again while holding it, but
+    cannot upgrade a read lock into a write lock.
+    """
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = {}
+        self._writer = None
+        self._writes = 0
+        self._waiting_writers = 0
+
+    @contextlib.contextmanager
+    def read(self):
+        me = threading.current_thread()
+        with self._condition:
+            if self._writer is not me and me not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                count = self._readers.pop(me) - 1
+                if count:
+                    self._readers[me] = count
+                else:
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def write(self):
+        me = threading.current_thread()
+        with self._condition:
+            if self._writer is not me:
+                if me in self._readers:
+                    raise RuntimeError('Cannot upgrade a read lock.')
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+            self._writes += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writes -= 1
+                if not self._writes:
+                    self._writer = None
+                    self._condition.notify_all()
+
+
+def _locked(write):
+    """Decorate a method of :class:`Memory` to run it while holding the lock
+    of its collection, shared for reading or exclusive for writing.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapped(self, collection_id, parent_id, *args, **kwargs):
+            lock = self._lock(collection_id, parent_id)
+            with (lock.write() if write else lock.read()):
+                return method(self, collection_id, parent_id, *args, **kwargs)
+        return wrapped
+    return decorator
 
 
 class Memory(MemoryBasedStorage):
@@ -155,21 +392,161 @@ class Memory(MemoryBasedStorage):
     Enable in configuration::
 
         cliquet.storage_backend = cliquet.storage.memory
+
+    Secondary indexes (see :class:`FieldIndex`) are kept for the
+    ``last_modified`` field, and for the ``indexed_fields`` of each
+    collection, given in the constructor or declared in the resources
+    schemas (see :meth:`initialize_indexes`), in order to avoid scanning
+    every record when filtering on them. Tombstones are not indexed.
+
+    Each collection is protected by a :class:`ReadWriteLock`, so that the
+    backend can be shared by the threads of the server: timestamps are
+    strictly increasing, and lookups never see a partial write.
     """
-    def __init__(self, *args, **kwargs):
+    def __init__(self, indexed_fields=None, *args, **kwargs):
         super(Memory, self).__init__(*args, **kwargs)
+        self._locks_lock = threading.Lock()
+        self._indexed_fields = {}
         self.flush()
+        if indexed_fields:
+            self.initialize_indexes(indexed_fields)
+
+    def initialize_indexes(self, indexed_fields, unique_fields=None):
+        """Index the specified fields of collections, and stop indexing the
+        ones that are not specified anymore.
+        """
+        with self._locks_lock:
+            self._indexed_fields = dict((collection_id, tuple(fields))
+                                        for collection_id, fields
+                                        in indexed_fields.items())
+            collections = list(self._locks.items())
+        for (collection_id, parent_id), lock in collections:
+            with lock.write():
+                self._build_indexes(collection_id, parent_id)
+
+    def _build_indexes(self, collection_id, parent_id):
+        """Build the missing indexes of the collection from its records,
+        and drop the ones of fields that are not indexed anymore.
+
+        The collection must be locked for writing.
+        """
+        fields = self._indexed_fields.get(collection_id, tuple())
+        fields = set(fields) | set([DEFAULT_MODIFIED_FIELD])
+        indexes = self._indexes[(collection_id, parent_id)]
+        for field in set(indexes.keys()) - fields:
+            del indexes[field]
+        for field in fields - set(indexes.keys()):
+            index = FieldIndex(field)
+            index.add_many(self._store[collection_id][parent_id].items())
+            indexes[field] = index
 
     def flush(self, auth=None):
-        self._store = tree()
-        self._cemetery = tree()
-        self._timestamps = defaultdict(dict)
+        with self._locks_lock:
+            self._locks = {}
+            self._store = tree()
+            self._cemetery = tree()
+            self._timestamps = defaultdict(dict)
+            self._indexes = defaultdict(dict)
+
+    def _lock(self, collection_id, parent_id):
+        """Return the lock of the collection, creating it on first use.
+
+        The nested dicts of the collection are created at the same time,
+        since their implicit creation is not atomic.
+        """
+        key = (collection_id, parent_id)
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._locks_lock:
+                lock = self._locks.get(key)
+                if lock is None:
+                    self._store[collection_id][parent_id]
+                    self._cemetery[collection_id][parent_id]
+                    self._timestamps[collection_id]
+                    self._build_indexes(collection_id, parent_id)
+                    lock = self._locks[key] = ReadWriteLock()
+        return lock
+
+    def _set_record(self, collection_id, parent_id, object_id, record):
+        """Store the record, and update the indexes of its collection."""
+        collection = self._store[collection_id][parent_id]
+        indexes = self._indexes.get((collection_id, parent_id), {})
+        for index in indexes.values():
+            if object_id in collection:
+                index.remove(object_id)
+            index.add(object_id, record)
+        collection[object_id] = record
+
+    def _pop_record(self, collection_id, parent_id, object_id):
+        """Remove the record from the store and the indexes, if it exists.
+        """
+        collection = self._store[collection_id][parent_id]
+        if object_id not in collection:
+            return None
+        indexes = self._indexes.get((collection_id, parent_id), {})
+        for index in indexes.values():
+            index.remove(object_id)
+        return collection.pop(object_id)
+
+    def _set_tombstone(self, collection_id, parent_id, object_id,
+                       tombstone):
+        """Store the tombstone of a deleted record."""
+        self._cemetery[collection_id][parent_id][object_id] = tombstone
+
+    def _pop_tombstones(self, collection_id, parent_id, object_ids):
+        """Remove the specified tombstones, if they exist."""
+        tombstones = self._cemetery[collection_id][parent_id]
+        for object_id in object_ids:
+            tombstones.pop(object_id, None)
+
+    def _lookup_records(self, collection_id, parent_id, filters, id_field):
+        """Return the records of the collection that may match the filters,
+        narrowed down with indexes when possible.
+        """
+        collection = self._store[collection_id][parent_id]
+        indexes = self._indexes.get((collection_id, parent_id), {})
+        candidates = None
+        for filter_ in filters or []:
+            if filter_.operator not in (COMPARISON.EQ, COMPARISON.IN,
+                                        COMPARISON.LT, COMPARISON.MAX,
+                                        COMPARISON.GT, COMPARISON.MIN):
+                continue
+            if filter_.field == id_field:
+                if filter_.operator == COMPARISON.EQ:
+                    values = [filter_.value]
+                elif filter_.operator == COMPARISON.IN:
+                    values = filter_.value
+                else:
+                    continue
+                try:
+                    ids = set([v for v in values if v in collection])
+                except TypeError:
+                    continue
+            else:
+                index = indexes.get(filter_.field)
+                if index is None:
+                    continue
+                ids = index.lookup(filter_)
+                if ids is None:
+                    continue
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                break
+
+        if candidates is None:
+            return list(collection.values())
+        return [collection[object_id] for object_id in candidates]
 
     def collection_timestamp(self, collection_id, parent_id, auth=None):
+        lock = self._lock(collection_id, parent_id)
         ts = self._timestamps[collection_id].get(parent_id)
         if ts is not None:
             return ts
-        return self._bump_timestamp(collection_id, parent_id)
+        with lock.write():
+            ts = self._timestamps[collection_id].get(parent_id)
+            if ts is not None:
+                return ts
+            return self._bump_timestamp(collection_id, parent_id)
 
     def _bump_timestamp(self, collection_id, parent_id):
         """Timestamp are base on current millisecond.
@@ -187,6 +564,7 @@ class Memory(MemoryBasedStorage):
         self._timestamps[collection_id][parent_id] = current
         return current
 
+    @_locked(write=True)
     def create(self, collection_id, parent_id, record, id_generator=None,
                unique_fields=None, id_field=DEFAULT_ID_FIELD,
                modified_field=DEFAULT_MODIFIED_FIELD, auth=None):
@@ -200,9 +578,33 @@ class Memory(MemoryBasedStorage):
         _id = record.setdefault(id_field, id_generator())
         self.set_record_timestamp(collection_id, parent_id, record,
                                   modified_field=modified_field)
-        self._store[collection_id][parent_id][_id] = record
+        self._set_record(collection_id, parent_id, _id, record)
         return record
 
+    @_locked(write=True)
+    def create_many(self, collection_id, parent_id, records,
+                    id_generator=None, unique_fields=None,
+                    id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        id_generator = id_generator or self.id_generator
+        records = [record.copy() for record in records]
+        for record in records:
+            record.setdefault(id_field, id_generator())
+
+        self.check_unicity_many(collection_id, parent_id, records,
+                                unique_fields=unique_fields,
+                                id_field=id_field,
+                                for_creation=True)
+
+        for record in records:
+            self.set_record_timestamp(collection_id, parent_id, record,
+                                      modified_field=modified_field)
+            self._set_record(collection_id, parent_id, record[id_field],
+                             record)
+        return records
+
+    @_locked(write=False)
     def get(self, collection_id, parent_id, object_id,
             id_field=DEFAULT_ID_FIELD,
             modified_field=DEFAULT_MODIFIED_FIELD,
@@ -212,6 +614,7 @@ class Memory(MemoryBasedStorage):
             raise exceptions.RecordNotFoundError(object_id)
         return collection[object_id]
 
+    @_locked(write=True)
     def update(self, collection_id, parent_id, object_id, record,
                unique_fields=None, id_field=DEFAULT_ID_FIELD,
                modified_field=DEFAULT_MODIFIED_FIELD,
@@ -225,15 +628,35 @@ class Memory(MemoryBasedStorage):
 
         self.set_record_timestamp(collection_id, parent_id, record,
                                   modified_field=modified_field)
-        self._store[collection_id][parent_id][object_id] = record
+        self._set_record(collection_id, parent_id, object_id, record)
         return record
 
+    @_locked(write=True)
+    def update_many(self, collection_id, parent_id, records,
+                    unique_fields=None, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        records = [record.copy() for record in records]
+
+        self.check_unicity_many(collection_id, parent_id, records,
+                                unique_fields=unique_fields,
+                                id_field=id_field)
+
+        for record in records:
+            self.set_record_timestamp(collection_id, parent_id, record,
+                                      modified_field=modified_field)
+            self._set_record(collection_id, parent_id, record[id_field],
+                             record)
+        return records
+
+    @_locked(write=True)
     def delete(self, collection_id, parent_id, object_id,
                id_field=DEFAULT_ID_FIELD, with_deleted=True,
                modified_field=DEFAULT_MODIFIED_FIELD,
                deleted_field=DEFAULT_DELETED_FIELD,
                auth=None):
-        existing = self.get(collection_id, parent_id, object_id)
+        self.get(collection_id, parent_id, object_id)
+        existing = self._pop_record(collection_id, parent_id, object_id)
         self.set_record_timestamp(collection_id, parent_id, existing,
                                   modified_field=modified_field)
         existing = self.strip_deleted_record(collection_id,
@@ -243,32 +666,45 @@ class Memory(MemoryBasedStorage):
         # Add to deleted items, remove from store.
         if with_deleted:
             deleted = existing.copy()
-            self._cemetery[collection_id][parent_id][object_id] = deleted
-        self._store[collection_id][parent_id].pop(object_id)
+            self._set_tombstone(collection_id, parent_id, object_id, deleted)
 
         return existing
 
+    @_locked(write=True)
     def purge_deleted(self, collection_id, parent_id, before=None,
                       id_field=DEFAULT_ID_FIELD,
                       modified_field=DEFAULT_MODIFIED_FIELD,
                       auth=None):
-        num_deleted = len(self._cemetery[collection_id][parent_id].keys())
+        tombstones = self._cemetery[collection_id][parent_id]
         if before is not None:
-            kept = {key: value for key, value in
-                    self._cemetery[collection_id][parent_id].items()
-                    if value[modified_field] >= before}
+            purged = [key for key, value in tombstones.items()
+                      if value[modified_field] < before]
         else:
-            kept = {}
-        self._cemetery[collection_id][parent_id] = kept
-        return num_deleted - len(kept.keys())
-
+            purged = list(tombstones.keys())
+        self._pop_tombstones(collection_id, parent_id, purged)
+        return len(purged)
+
+    @_locked(write=True)
+    def delete_all(self, collection_id, parent_id, *args, **kwargs):
+        return super(Memory, self).delete_all(collection_id, parent_id,
+                                              *args, **kwargs)
+
+    def expire_deleted(self, before, auth=None):
+        with self._locks_lock:
+            collections = list(self._locks.keys())
+        for collection_id, parent_id in collections:
+            self.purge_deleted(collection_id, parent_id, before=before)
+
+    @_locked(write=False)
     def get_all(self, collection_id, parent_id, filters=None, sorting=None,
                 pagination_rules=None, limit=None, include_deleted=False,
                 id_field=DEFAULT_ID_FIELD,
                 modified_field=DEFAULT_MODIFIED_FIELD,
                 deleted_field=DEFAULT_DELETED_FIELD,
-                auth=None):
-        records = list(self._store[collection_id][parent_id].values())
+                auth=None, raw=False):
+        # Records are kept decoded: the ``raw`` hint is ignored.
+        records = self._lookup_records(collection_id, parent_id, filters,
+                                       id_field)
 
         deleted = []
         if include_deleted:
@@ -283,6 +719,98 @@ class Memory(MemoryBasedStorage):
         return records, count
 
 
+# Operators taking the filter value first (e.g. ``value > field`` for LT).
+_REFLECTED_OPERATORS = {
+    COMPARISON.LT: operator.gt,
+    COMPARISON.MAX: operator.ge,
+    COMPARISON.EQ: operator.eq,
+    COMPARISON.NOT: operator.ne,
+    COMPARISON.MIN: operator.le,
+    COMPARISON.GT: operator.lt,
+}
+
+# Compiled filters shapes, bounded since fields come from querystrings.
+_compiled_shapes = {}
+_MAX_COMPILED_SHAPES = 1024
+
+
+def _membership(values, expected):
+    """Return a function checking whether a value is (or is not, if
+    `expected` is ``False``) among the specified values.
+    """
+    try:
+        values = frozenset(values)
+    except TypeError:
+        return lambda left: (left in values) is expected
+
+    def check(left):
+        try:
+            return (left in values) is expected
+        except TypeError:
+            # Unhashable values (e.g. lists) cannot be among them.
+            return not expected
+    return check
+
+
+def _compile_shape(shape):
+    """Return a function that binds the values of filters of the specified
+    shape (i.e. fields and operators) into a predicate.
+    """
+    factories = []
+    for field, op in shape:
+        if op == COMPARISON.IN:
+            factory = functools.partial(_membership, expected=True)
+        elif op == COMPARISON.EXCLUDE:
+            factory = functools.partial(_membership, expected=False)
+        else:
+            factory = functools.partial(functools.partial,
+                                        _REFLECTED_OPERATORS[op])
+        factories.append((field, factory))
+
+    def bind(values):
+        checks = [(field, factory(value))
+                  for (field, factory), value in zip(factories, values)]
+
+        def predicate(record):
+            for field, check in checks:
+                if not check(record.get(field)):
+                    return False
+            return True
+        return predicate
+    return bind
+
+
+def compile_filters(filters):
+    """Compile the specified filters into a predicate on records, that
+    stops at the first filter that does not match.
+
+    :returns: a function that takes a record and returns a ``bool``.
+    """
+    shape = tuple([(f.field, f.operator) for f in filters])
+    bind = _compiled_shapes.get(shape)
+    if bind is None:
+        if len(_compiled_shapes) >= _MAX_COMPILED_SHAPES:
+            _compiled_shapes.clear()
+        bind = _compiled_shapes[shape] = _compile_shape(shape)
+    return bind([f.value for f in filters])
+
+
+def compile_pagination_rules(pagination_rules):
+    """Compile the specified pagination rules into a predicate on records,
+    that matches if any of the rules matches.
+
+    :returns: a function that takes a record and returns a ``bool``.
+    """
+    rules = [compile_filters(rule) for rule in pagination_rules]
+
+    def predicate(record):
+        for rule in rules:
+            if rule(record):
+                return True
+        return False
+    return predicate
+
+
 def get_unicity_rules(collection_id, parent_id, record, unique_fields,
                       id_field, for_creation):
     """Build filter to target existing records that violate the resource
@@ -310,27 +838,89 @@ def get_unicity_rules(collection_id, parent_id, record, unique_fields,
     return rules
 
 
-def apply_sorting(records, sorting):
-    """Sort the specified records, using cumulative python sorting.
+class _Extreme(object):
+    """Value that compares as the highest, or lowest, of all values."""
+    def __init__(self, highest):
+        self.highest = highest
+
+    def __lt__(self, other):
+        return not self.highest and other is not self
+
+    def __gt__(self, other):
+        return self.highest and other is not self
+
+
+_HIGHEST = _Extreme(highest=True)
+
+
+def _column(field):
+    """Return the sort key of the specified field, where records that miss
+    it are sorted after the others.
+    """
+    return lambda r: r.get(field, _HIGHEST)
+
+
+def sorting_key(sorting):
+    """Compile the specified sorting, whose fields all have the same
+    direction, into a key function, and tell whether it has to be applied
+    in reverse order.
+
+    Records that miss a field are sorted after the others in ascending order
+    (and before in descending order), like ``NULL`` values with PostgreSQL.
+
+    :returns: the key function, and the reverse flag.
+    :rtype: tuple
+    """
+    fields = [sort.field for sort in sorting]
+    reverse = sorting[0].direction < 0
+    if len(fields) == 1:
+        return _column(fields[0]), reverse
+    return (lambda r: tuple([r.get(f, _HIGHEST) for f in fields])), reverse
+
+
+def apply_sorting(records, sorting, limit=None):
+    """Sort the specified records.
+
+    If all fields are sorted in the same direction, records are sorted once
+    with a composite key, and if `limit` is specified, only the first ones
+    are selected, in O(n log limit) instead of sorting the whole list.
+
+    With mixed directions, records are sorted once per field, from the last
+    one, relying on the stability of python sorting, which is faster than
+    comparing composite keys of reversed values.
     """
     result = list(records)
 
-    if not result:
-        return result
+    if not sorting:
+        return result[:limit] if limit else result
+
+    directions = set([sort.direction < 0 for sort in sorting])
+    if len(directions) > 1:
+        for sort in reversed(sorting):
+            result.sort(key=_column(sort.field), reverse=sort.direction < 0)
+        return result[:limit] if limit else result
 
-    first_record = result[0]
+    key, reverse = sorting_key(sorting)
 
-    def column(first, record, name):
-        empty = first.get(name, float('inf'))
-        return record.get(name, empty)
+    if limit and limit < len(result):
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        return select(limit, result, key=key)
 
-    for sort in reversed(sorting):
-        result = sorted(result,
-                        key=lambda r: column(first_record, r, sort.field),
-                        reverse=(sort.direction < 0))
+    return sorted(result, key=key, reverse=reverse)
 
-    return result
+
+def index_resources_fields(config, storage):
+    """Index the ``indexed_fields`` of the resources of the application,
+    once they are all registered.
+    """
+    def initialize_indexes(event):
+        registry = event.app.registry
+        storage.initialize_indexes(collections_option(registry,
+                                                      'indexed_fields'))
+    config.add_subscriber(initialize_indexes, ApplicationCreated)
 
 
 def load_from_config(config):
-    return Memory()
+    storage = Memory()
+    index_resources_fields(config, storage)
+    return storage
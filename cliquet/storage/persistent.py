@@ -0,0 +1,328 @@
+import atexit
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+from cliquet import logger
+from cliquet.storage import memory
+from cliquet.utils import json
+
+
+SNAPSHOT_FILENAME = 'snapshot.jsonl'
+JOURNAL_FILENAME = 'journal.jsonl'
+
+
+class Journal(object):
+    """Append-only file of JSON lines, synced to disk by batches.
+
+    Every line is flushed to the operating system as soon as it is written,
+    thus it survives a crash of the process. It is synced to disk
+    (``fsync``) every `fsync_interval` seconds though, by a background
+    thread, if lines were written meanwhile.
+
+    :param float fsync_interval: ``0`` to sync every line, ``None`` to let
+        the operating system decide.
+    """
+    def __init__(self, path, fsync_interval=1.0, length=0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.length = length
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+        self._unsynced = False
+        self._closed = threading.Event()
+        self._sync_thread = None
+        if fsync_interval:
+            self._sync_thread = threading.Thread(
+                target=self._sync_periodically)
+            self._sync_thread.daemon = True
+            self._sync_thread.start()
+
+    def append(self, entry):
+        line = json.dumps(entry).encode('utf-8') + b'\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.length += 1
+            if self.fsync_interval == 0:
+                os.fsync(self._file.fileno())
+            else:
+                self._unsynced = True
+            return self.length
+
+    def sync(self):
+        """Sync the lines written since the last time to disk, if any."""
+        with self._lock:
+            if self._unsynced and not self._file.closed:
+                os.fsync(self._file.fileno())
+                self._unsynced = False
+
+    def _sync_periodically(self):
+        while not self._closed.wait(self.fsync_interval):
+            self.sync()
+
+    def truncate(self):
+        with self._lock:
+            self._file.seek(0)
+            self._file.truncate()
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+            self.length = 0
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._closed.set()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+        if self._sync_thread is not None:
+            self._sync_thread.join()
+
+
+def read_entries(path):
+    """Yield the entries of a JSON lines file, read with memory-mapped I/O,
+    along with the offset of the end of each line.
+
+    Reading stops at the first incomplete or invalid line (e.g. if the
+    process was killed while writing it).
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            line = mapped.readline()
+            while line:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('Incomplete line')
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    logger.warning('Ignore invalid entries at offset %s of '
+                                   '%s' % (mapped.tell() - len(line), path))
+                    return
+                yield entry, mapped.tell()
+                line = mapped.readline()
+        finally:
+            mapped.close()
+
+
+class PersistentMemory(memory.Memory):
+    """Storage backend in memory, persisted on disk.
+
+    Records are kept and looked up in memory, like with
+    :class:`cliquet.storage.memory.Memory`, but every change is appended to
+    a journal file. Once the journal has reached `snapshot_threshold`
+    entries, the whole storage is written into a snapshot file, and the
+    journal is emptied. At startup, the snapshot is loaded and the journal
+    replayed, thus the restart time depends on the size of the storage
+    rather than on its history.
+
+    Enable in configuration::
+
+        cliquet.storage_backend = cliquet.storage.persistent
+        cliquet.storage_path = /var/lib/cliquet
+
+    Only one process can use the same folder. This suits small single-node
+    deployments, that run a threaded server. The journal is synced to disk
+    when the process exits.
+    """
+    def __init__(self, path, fsync_interval=1.0, snapshot_threshold=10000,
+                 *args, **kwargs):
+        self._journal = None
+        super(PersistentMemory, self).__init__(*args, **kwargs)
+        self.path = path
+        self.snapshot_threshold = snapshot_threshold
+        self._snapshot_requested = threading.Event()
+        self._snapshot_thread = None
+        self._closed = False
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self._snapshot_path = os.path.join(path, SNAPSHOT_FILENAME)
+        self._journal_path = os.path.join(path, JOURNAL_FILENAME)
+
+        for entry, _ in read_entries(self._snapshot_path):
+            self._apply(entry)
+        length = 0
+        end = 0
+        for entry, end in read_entries(self._journal_path):
+            self._apply(entry)
+            length += 1
+        if os.path.exists(self._journal_path):
+            # Drop invalid entries, if any, before appending new ones.
+            with open(self._journal_path, 'ab') as f:
+                f.truncate(end)
+
+        self._journal = Journal(self._journal_path,
+                                fsync_interval=fsync_interval,
+                                length=length)
+
+    def _apply(self, entry):
+        """Apply an entry of the journal or snapshot, without logging it."""
+        action, collection_id, parent_id = entry[:3]
+        args = entry[3:]
+        self._lock(collection_id, parent_id)
+        if action == 'set':
+            memory.Memory._set_record(self, collection_id, parent_id, *args)
+        elif action == 'pop':
+            memory.Memory._pop_record(self, collection_id, parent_id, *args)
+        elif action == 'tombstone':
+            memory.Memory._set_tombstone(self, collection_id, parent_id,
+                                         *args)
+        elif action == 'purge':
+            memory.Memory._pop_tombstones(self, collection_id, parent_id,
+                                          *args)
+        elif action == 'timestamp':
+            self._timestamps[collection_id][parent_id] = args[0]
+
+    def _log(self, *entry):
+        if self._journal is None:
+            return
+        length = self._journal.append(entry)
+        if self.snapshot_threshold and length >= self.snapshot_threshold:
+            self._request_snapshot()
+
+    def _request_snapshot(self):
+        # Snapshots are taken in a separate thread, since every collection
+        # has to be locked, while the current one may already be.
+        if self._snapshot_thread is None:
+            self._snapshot_thread = threading.Thread(
+                target=self._take_requested_snapshots)
+            self._snapshot_thread.daemon = True
+            self._snapshot_thread.start()
+        self._snapshot_requested.set()
+
+    def _take_requested_snapshots(self):
+        while True:
+            self._snapshot_requested.wait()
+            self._snapshot_requested.clear()
+            if self._closed:
+                return
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.error(e)
+
+    def _set_record(self, collection_id, parent_id, object_id, record):
+        super(PersistentMemory, self)._set_record(collection_id, parent_id,
+                                                  object_id, record)
+        self._log('set', collection_id, parent_id, object_id, record)
+
+    def _pop_record(self, collection_id, parent_id, object_id):
+        existing = super(PersistentMemory, self)._pop_record(collection_id,
+                                                             parent_id,
+                                                             object_id)
+        if existing is not None:
+            self._log('pop', collection_id, parent_id, object_id)
+        return existing
+
+    def _set_tombstone(self, collection_id, parent_id, object_id,
+                       tombstone):
+        super(PersistentMemory, self)._set_tombstone(collection_id,
+                                                     parent_id, object_id,
+                                                     tombstone)
+        self._log('tombstone', collection_id, parent_id, object_id,
+                  tombstone)
+
+    def _pop_tombstones(self, collection_id, parent_id, object_ids):
+        super(PersistentMemory, self)._pop_tombstones(collection_id,
+                                                      parent_id, object_ids)
+        if object_ids:
+            self._log('purge', collection_id, parent_id, object_ids)
+
+    def _bump_timestamp(self, collection_id, parent_id):
+        current = super(PersistentMemory, self)._bump_timestamp(collection_id,
+                                                                parent_id)
+        self._log('timestamp', collection_id, parent_id, current)
+        return current
+
+    def snapshot(self):
+        """Write the whole storage into the snapshot file, and empty the
+        journal.
+
+        Every collection is locked meanwhile. The snapshot is written into a
+        temporary file first, and replaces the previous one once complete.
+        """
+        # The collections locks are never acquired while holding the lock of
+        # their registry, which is held by threads that create collections,
+        # possibly while writing in another one.
+        acquired = OrderedDict()
+        try:
+            while True:
+                with self._locks_lock:
+                    pending = [lock for lock in self._locks.values()
+                               if id(lock) not in acquired]
+                    if not pending:
+                        # Every collection is locked, and no other one can
+                        # be created meanwhile.
+                        self._write_snapshot()
+                        self._journal.truncate()
+                        return
+                for lock in pending:
+                    context = lock.write()
+                    context.__enter__()
+                    acquired[id(lock)] = (lock, context)
+        finally:
+            for _, context in reversed(list(acquired.values())):
+                context.__exit__(None, None, None)
+
+    def _write_snapshot(self):
+        def dump(*entry):
+            f.write(json.dumps(entry).encode('utf-8') + b'\n')
+
+        temporary = self._snapshot_path + '.tmp'
+        with open(temporary, 'wb') as f:
+            for collection_id, parents in self._timestamps.items():
+                for parent_id, timestamp in parents.items():
+                    dump('timestamp', collection_id, parent_id, timestamp)
+            for collection_id, parents in self._store.items():
+                for parent_id, records in parents.items():
+                    for object_id, record in records.items():
+                        dump('set', collection_id, parent_id, object_id,
+                             record)
+            for collection_id, parents in self._cemetery.items():
+                for parent_id, tombstones in parents.items():
+                    for object_id, tombstone in tombstones.items():
+                        dump('tombstone', collection_id, parent_id,
+                             object_id, tombstone)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(temporary, self._snapshot_path)
+
+    def flush(self, auth=None):
+        super(PersistentMemory, self).flush(auth=auth)
+        if self._journal is not None:
+            self._journal.truncate()
+            if os.path.exists(self._snapshot_path):
+                os.remove(self._snapshot_path)
+
+    def close(self):
+        """Stop taking snapshots, and sync the journal to disk."""
+        if self._closed:
+            return
+        self._closed = True
+        self._snapshot_requested.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        self._journal.close()
+
+
+def load_from_config(config):
+    settings = config.get_settings()
+    path = settings['storage_path']
+    if not path:
+        raise ValueError('No folder in storage_path setting.')
+    fsync_interval = int(settings['storage_fsync_interval_ms'])
+    snapshot_threshold = int(settings['storage_snapshot_threshold'])
+    storage = PersistentMemory(path=path,
+                               fsync_interval=(fsync_interval / 1000.0
+                                               if fsync_interval >= 0
+                                               else None),
+                               snapshot_threshold=snapshot_threshold)
+    atexit.register(storage.close)
+    memory.index_resources_fields(config, storage)
+    return storage
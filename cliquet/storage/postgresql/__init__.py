@@ -1,28 +1,298 @@
+import calendar
 import contextlib
+import datetime
+import hashlib
+import itertools
 import os
+import re
+import select
+import threading
+import time
+import uuid
 import warnings
-from collections import defaultdict
+import weakref
+from collections import OrderedDict, defaultdict, namedtuple
 
 import six
+from pyramid.events import NewRequest
+from pyramid.settings import asbool, aslist
 from six.moves.urllib import parse as urlparse
 
 from cliquet import logger
 from cliquet.storage import (
     StorageBase, exceptions, Filter,
     DEFAULT_ID_FIELD, DEFAULT_MODIFIED_FIELD, DEFAULT_DELETED_FIELD)
-from cliquet.utils import COMPARISON, json, psycopg2
+from cliquet.utils import COMPARISON, RawJSON, json, msec_time, psycopg2
 
 if psycopg2:
+    import psycopg2.errorcodes
     import psycopg2.extras
     import psycopg2.pool
 
     psycopg2.extensions.register_type(psycopg2.extensions.UNICODE)
     psycopg2.extensions.register_type(psycopg2.extensions.UNICODEARRAY)
 
+    class TimeoutCursor(psycopg2.extras.DictCursor):
+        """Cursor that limits the duration of each of its statements, by
+        setting ``statement_timeout`` along with it, without any additional
+        round trip.
+        """
+        timeout = None
+        """Function returning the maximum duration of the next statement
+        in milliseconds, or ``None`` if unlimited."""
+
+        def execute(self, query, vars=None):
+            timeout = self.timeout() if self.timeout else None
+            if timeout is not None:
+                set_timeout = 'SET LOCAL statement_timeout = %d;' % timeout
+                query = '%s %s' % (set_timeout, query)
+            return self._send(query, vars)
+
+        def _send(self, query, vars):
+            return super(TimeoutCursor, self).execute(query, vars)
+
+    class SavepointCursor(TimeoutCursor):
+        """Cursor that sets a savepoint along with its first statement, in
+        order to roll back only its own changes on error, without any
+        additional round trip.
+        """
+        savepoint = None
+
+        def _send(self, query, vars):
+            if not self.savepoint:
+                return super(SavepointCursor, self)._send(query, vars)
+            query = 'SAVEPOINT %s; %s' % (self.savepoint, query)
+            try:
+                result = super(SavepointCursor, self)._send(query, vars)
+            except psycopg2.Error as e:
+                # The savepoint is set only if the server received it.
+                if e.pgcode is not None:
+                    self.savepoint = None
+                raise
+            self.savepoint = None
+            return result
+
+
+BULK_CHUNK_SIZE = 1000
+"""Maximum number of records written by each statement of bulk operations."""
+
+_PLACEHOLDER = re.compile(r'%\((\w+)\)s')
+_FIELD_HOLDER = re.compile(r'^\w+_field_\d+$')
+_PARTITION_NAME = re.compile(r'^deleted_(\d{8})_(\d{8})$')
+
+UNIQUE_INDEX = '(parent_id, (data->%(field)s))'
+"""Definition of the unique indexes of record fields."""
+
+CHANGES_CHANNEL = 'cliquet_changes'
+"""Channel of the notifications sent when records are written."""
+
+_CHANNEL_NAME = re.compile(r'^\w+$')
+
+Change = namedtuple('Change', ['parent_id', 'collection_id', 'timestamp'])
+"""Notified change of a collection (see
+:meth:`PostgreSQL.subscribe_changes`)."""
+
+
+class ConnectionPool(object):
+    """Thread-safe pool of PostgreSQL connections.
+
+    Unlike :class:`psycopg2.pool.ThreadedConnectionPool`, that fails
+    immediately when every connection is in use, threads wait for a
+    connection to be released, up to ``timeout`` seconds.
+
+    Waiting times and usage are kept in order to be monitored
+    (see :meth:`stats`).
+    """
+    def __init__(self, minconn, maxconn, timeout=None, **conn_kwargs):
+        self._pool = psycopg2.pool.ThreadedConnectionPool(minconn=minconn,
+                                                          maxconn=maxconn,
+                                                          **conn_kwargs)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._released = threading.Condition()
+        self._in_use = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._max_wait = 0.0
+
+    def getconn(self):
+        """Obtain a connection, waiting for one to be released if every
+        connection is in use.
+
+        :raises: :exc:`psycopg2.pool.PoolError` if none was released
+            before timeout.
+        """
+        started = time.time()
+        with self._released:
+            if self._in_use >= self.maxconn:
+                self._waits += 1
+            while self._in_use >= self.maxconn:
+                remaining = None
+                if self.timeout is not None:
+                    remaining = self.timeout - (time.time() - started)
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        msg = "No connection released within %ss" % (
+                            self.timeout)
+                        raise psycopg2.pool.PoolError(msg)
+                self._released.wait(remaining)
+            self._in_use += 1
+            self._max_wait = max(self._max_wait, time.time() - started)
+
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._release()
+            raise
+
+    def putconn(self, conn, close=False):
+        """Give back a connection obtained with :meth:`getconn`."""
+        try:
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._release()
+
+    def _release(self):
+        with self._released:
+            self._in_use -= 1
+            self._released.notify()
+
+    def stats(self):
+        """Return the pool usage figures.
+
+        :returns: the pool ``size``, the number of connections ``in_use``,
+            the number of checkouts that had to ``wait`` or ``timeout``, and
+            the longest waiting time in seconds (``max_wait``).
+        :rtype: dict
+        """
+        with self._released:
+            return {
+                'size': self.maxconn,
+                'in_use': self._in_use,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'max_wait': self._max_wait,
+            }
+
+
+def _backend_error(error):
+    """Wrap the specified PostgreSQL error in a storage exception."""
+    if isinstance(error, psycopg2.extensions.QueryCanceledError):
+        return exceptions.BackendTimeout(original=error)
+    return exceptions.BackendError(original=error)
+
+
+class Listener(threading.Thread):
+    """Thread listening to PostgreSQL notifications on a dedicated
+    connection, and passing their payloads to the subscribers of their
+    channel.
+
+    Channels are listened within ``poll_interval`` seconds after their
+    first subscription. If the connection is lost, it is opened again
+    every ``retry_interval`` seconds: notifications sent in the meantime
+    are missed.
+    """
+    poll_interval = 1
+    retry_interval = 1
+
+    def __init__(self, **conn_kwargs):
+        super(Listener, self).__init__(name='cliquet-listener')
+        self.daemon = True
+        self._conn_kwargs = conn_kwargs
+        self._conn = None
+        self._listening = set()
+        self._subscribers = defaultdict(list)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def subscribe(self, channel, callback):
+        """Call `callback` with the payload of every notification sent on
+        `channel`.
+        """
+        if not _CHANNEL_NAME.match(channel):
+            raise ValueError('Invalid channel name %r' % channel)
+        with self._lock:
+            self._subscribers[channel].append(callback)
+
+    def unsubscribe(self, channel, callback):
+        with self._lock:
+            self._subscribers[channel].remove(callback)
+
+    def stop(self):
+        """Stop listening, and close the connection."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self._poll()
+            except psycopg2.Error as e:
+                logger.error(e)
+                self._close()
+                self._stopped.wait(self.retry_interval)
+        self._close()
+
+    def _poll(self):
+        if self._conn is None:
+            self._conn = psycopg2.connect(**self._conn_kwargs)
+            self._conn.autocommit = True
+
+        with self._lock:
+            channels = set(self._subscribers.keys()) - self._listening
+        for channel in channels:
+            with self._conn.cursor() as cursor:
+                cursor.execute('LISTEN %s;' % channel)
+            self._listening.add(channel)
+
+        ready, _, _ = select.select([self._conn], [], [], self.poll_interval)
+        if not ready:
+            return
+
+        self._conn.poll()
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            with self._lock:
+                callbacks = list(self._subscribers[notify.channel])
+            for callback in callbacks:
+                try:
+                    callback(notify.payload)
+                except Exception as e:
+                    logger.error(e)
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+        self._conn = None
+        self._listening = set()
+
 
 class PostgreSQLClient(object):
 
-    pool = None
+    pools = {}
+    """Connection pools, by backend class and connection parameters. Each
+    backend (e.g. storage, cache, permission) has its own, so that the
+    traffic of one of them cannot starve the others."""
+
+    replica_check_interval = 1
+    """Number of seconds during which the status of a replica is cached."""
+
+    _transaction = threading.local()
+    """Connections pinned for the current request, by connection
+    parameters (see :meth:`transaction`)."""
+
+    _savepoints = itertools.count()
+
+    listeners = {}
+    """Notifications listeners threads, by connection parameters (see
+    :meth:`listen`)."""
+
+    _listeners_lock = threading.Lock()
 
     def __init__(self, *args, **kwargs):
         if psycopg2 is None:
@@ -30,17 +300,37 @@ class PostgreSQLClient(object):
             raise ImportWarning(message)
 
         pool_size = kwargs.pop('pool_size')
+        pool_timeout = kwargs.pop('pool_timeout', None)
+        replicas = kwargs.pop('replicas', None) or []
+        self._max_replica_lag = kwargs.pop('max_replica_lag', None)
+        self._statement_timeout = kwargs.pop('statement_timeout', None)
+        self._request_timeout = kwargs.pop('request_timeout', None)
         self._conn_kwargs = kwargs
-        pool_klass = psycopg2.pool.ThreadedConnectionPool
-        if PostgreSQLClient.pool is None:
-            PostgreSQLClient.pool = pool_klass(minconn=pool_size,
-                                               maxconn=pool_size,
-                                               **self._conn_kwargs)
-        elif pool_size != self.pool.minconn:
+        self.pool = self._get_or_create_pool(self._conn_kwargs,
+                                             minconn=pool_size,
+                                             maxconn=pool_size,
+                                             timeout=pool_timeout)
+        if pool_size != self.pool.minconn:
             msg = ("Pool size %s ignored for PostgreSQL backend "
                    "(Already set to %s).") % (pool_size, self.pool.minconn)
             warnings.warn(msg)
 
+        # Replicas connections are opened lazily, in order to start even if
+        # some of them are unreachable.
+        self._replicas = []
+        for replica_kwargs in replicas:
+            pool = self._get_or_create_pool(replica_kwargs,
+                                            replica=True,
+                                            minconn=0,
+                                            maxconn=pool_size,
+                                            timeout=pool_timeout)
+            self._replicas.append(pool)
+        self._replicas_counter = itertools.count()
+        self._replicas_status = {}
+        # Read-your-writes: once something was written by the current
+        # thread, reads are not routed to replicas anymore.
+        self._local = threading.local()
+
         # When fsync setting is off, like on TravisCI or in during development,
         # cliquet some storage tests fail because commits are not applied
         # accross every opened connections.
@@ -54,39 +344,350 @@ class PostgreSQLClient(object):
                 warnings.warn('Option fsync = off detected. Disable pooling.')
                 self._always_close = True
 
+    def listen(self, channel, callback):
+        """Call `callback`, from a dedicated thread, with the payload of every
+        notification sent on `channel` (e.g. by other nodes).
+
+        A single thread and connection listen to notifications for each
+        database.
+        """
+        key = tuple(sorted(self._conn_kwargs.items()))
+        with PostgreSQLClient._listeners_lock:
+            listener = PostgreSQLClient.listeners.get(key)
+            if listener is None:
+                listener = Listener(**self._conn_kwargs)
+                PostgreSQLClient.listeners[key] = listener
+                listener.start()
+        listener.subscribe(channel, callback)
+
+    def unlisten(self, channel, callback):
+        """Remove a `callback` subscribed with :meth:`listen`."""
+        key = tuple(sorted(self._conn_kwargs.items()))
+        PostgreSQLClient.listeners[key].unsubscribe(channel, callback)
+
+    def _get_or_create_pool(self, conn_kwargs, replica=False, **pool_kwargs):
+        klass = self.__class__
+        backend = '%s.%s' % (klass.__module__, klass.__name__)
+        key = (backend, replica) + tuple(sorted(conn_kwargs.items()))
+        if key not in PostgreSQLClient.pools:
+            pool = ConnectionPool(**dict(conn_kwargs, **pool_kwargs))
+            PostgreSQLClient.pools[key] = pool
+        return PostgreSQLClient.pools[key]
+
+    @classmethod
     @contextlib.contextmanager
-    def connect(self, readonly=False):
+    def transaction(cls):
+        """Pin one connection per database for every backend call made
+        by the current thread (e.g. during a request), instead of checking
+        out a connection for each of them.
+
+        Connections stay in autocommit mode until something is written.
+        Changes are committed at exit, or rolled back if an exception was
+        raised. Each :meth:`connect` block is isolated by a savepoint,
+        released at the end of the block, so that an error only cancels its
+        own changes, as if it was not pinned.
+
+        .. note::
+
+            Rows locks (e.g. on collection timestamps) are held until the
+            end of the transaction, thus concurrent writes to the same
+            collections wait for each other.
+
+        If a transaction is already started by the current thread, the
+        outermost one takes care of everything.
+        """
+        if getattr(cls._transaction, 'connections', None) is not None:
+            yield
+            return
+
+        connections = cls._transaction.connections = OrderedDict()
+        try:
+            yield
+        except Exception:
+            cls._end_transaction(connections, commit=False)
+            raise
+        else:
+            cls._end_transaction(connections, commit=True)
+
+    @classmethod
+    def _end_transaction(cls, connections, commit):
+        cls._transaction.connections = None
+        error = None
+        for pool, conn, always_close in connections.values():
+            try:
+                if not conn.autocommit and not conn.closed:
+                    status = conn.get_transaction_status()
+                    aborted = psycopg2.extensions.TRANSACTION_STATUS_INERROR
+                    if status == aborted:
+                        # Would be rolled back silently on commit.
+                        error = error or psycopg2.Error(
+                            'Transaction was aborted.')
+                    if commit and error is None:
+                        conn.commit()
+                    else:
+                        conn.rollback()
+            except psycopg2.Error as e:
+                logger.error(e)
+                error = error or e
+                if not conn.closed:
+                    conn.rollback()
+            finally:
+                close = always_close or conn.closed != 0
+                pool.putconn(conn, close=close)
+
+        if error is not None:
+            raise exceptions.BackendError(original=error)
+
+    @contextlib.contextmanager
+    def _connect_pinned(self, connections, readonly=False, name=None):
+        """Instantiate a cursor on the connection pinned for the current
+        transaction (see :meth:`transaction`).
+        """
+        key = tuple(sorted(self._conn_kwargs.items()))
+        conn = None
+        cursor = None
+        savepoint = None
+        try:
+            if key not in connections:
+                conn = self.pool.getconn()
+                conn.autocommit = True
+                connections[key] = (self.pool, conn, self._always_close)
+            _, conn, _ = connections[key]
+
+            if (not readonly or name) and conn.autocommit:
+                # Start the transaction at the first write, or at the first
+                # server-side cursor.
+                conn.autocommit = False
+
+            options = dict(cursor_factory=TimeoutCursor)
+            if not conn.autocommit:
+                savepoint = 'cliquet_%s' % next(self._savepoints)
+            if name:
+                options['name'] = name
+                # A server-side cursor executes a single statement.
+                with conn.cursor() as savepoint_cursor:
+                    savepoint_cursor.execute('SAVEPOINT %s; %s' % (
+                        savepoint, self._format_timeout()))
+            elif savepoint:
+                options['cursor_factory'] = SavepointCursor
+            cursor = conn.cursor(**options)
+            if not name:
+                cursor.timeout = self._get_statement_timeout
+            if savepoint and not name:
+                cursor.savepoint = savepoint
+            # Start context
+            yield cursor
+            # End context
+            if name:
+                cursor.close()
+            savepoint_set = (savepoint and
+                             getattr(cursor, 'savepoint', None) is None)
+            if savepoint_set:
+                # Do not pile up subtransactions until the end of request.
+                with conn.cursor() as release_cursor:
+                    release_cursor.execute(
+                        'RELEASE SAVEPOINT %s;' % savepoint)
+        except Exception as e:
+            # Roll back the changes of this block only, if any.
+            savepoint_set = (savepoint and cursor is not None and
+                             getattr(cursor, 'savepoint', None) is None)
+            if savepoint_set and not conn.closed:
+                try:
+                    with conn.cursor() as rollback_cursor:
+                        rollback_cursor.execute(
+                            'ROLLBACK TO SAVEPOINT %s;' % savepoint)
+                except psycopg2.Error as rollback_error:
+                    logger.error(rollback_error)
+            if not isinstance(e, psycopg2.Error):
+                raise
+            if cursor and cursor.query:
+                logger.debug(cursor.query)
+            logger.error(e)
+            raise _backend_error(e)
+        finally:
+            if cursor:
+                cursor.close()
+
+    def begin_request(self, received_at):
+        """Limit the duration of the statements run by the current thread,
+        until :meth:`end_request` is called.
+
+        Each statement is limited to ``statement_timeout`` milliseconds,
+        and to the time left before ``request_timeout`` milliseconds have
+        elapsed since `received_at`.
+
+        :param int received_at: epoch timestamp of the request, in msec.
+        """
+        self._local.received_at = received_at
+
+    def end_request(self):
+        """Stop limiting the duration of statements (see
+        :meth:`begin_request`).
+        """
+        self._local.received_at = None
+
+    def _get_statement_timeout(self):
+        """Return the maximum duration of the next statement of the current
+        thread, in milliseconds, or ``None`` if unlimited.
+
+        :raises: :exc:`psycopg2.extensions.QueryCanceledError` if the
+            request deadline is already past.
+        """
+        received_at = getattr(self._local, 'received_at', None)
+        if received_at is None:
+            return None
+
+        timeout = self._statement_timeout
+        if self._request_timeout:
+            remaining = received_at + self._request_timeout - msec_time()
+            if remaining <= 0:
+                raise psycopg2.extensions.QueryCanceledError(
+                    'Request deadline exceeded.')
+            timeout = min(timeout or remaining, remaining)
+        return timeout
+
+    def _format_timeout(self):
+        timeout = self._get_statement_timeout()
+        if timeout is None:
+            return ''
+        return 'SET LOCAL statement_timeout = %d;' % timeout
+
+    def forget_writes(self):
+        """Route the read-only queries of the current thread to replicas
+        again, even if something was written (e.g. when a new request
+        starts).
+        """
+        self._local.has_written = False
+
+    def use_primary(self):
+        """Route the read-only queries of the current thread to the primary,
+        as if something was written (e.g. when a request that is going to
+        write starts, so that its checks read the latest data).
+        """
+        self._local.has_written = True
+
+    def _get_pool(self, readonly):
+        """Return the pool to obtain a connection from.
+
+        Read-only connections are obtained from replicas in turn, unless
+        they lag too much behind the primary, or if something was written
+        by the current thread.
+        """
+        has_written = getattr(self._local, 'has_written', False)
+        if not readonly or has_written:
+            return self.pool
+
+        for _ in self._replicas:
+            index = next(self._replicas_counter) % len(self._replicas)
+            replica = self._replicas[index]
+            if self._is_replica_usable(replica):
+                return replica
+
+        return self.pool
+
+    def _is_replica_usable(self, replica):
+        checked_at, usable = self._replicas_status.get(id(replica),
+                                                       (None, True))
+        now = time.time()
+        if checked_at and now - checked_at < self.replica_check_interval:
+            return usable
+
+        query = """
+        SELECT CASE WHEN pg_is_in_recovery()
+                    THEN EXTRACT(EPOCH FROM
+                                 now() - pg_last_xact_replay_timestamp())
+                    ELSE 0
+               END AS lag;
+        """
+        conn = None
+        try:
+            conn = replica.getconn()
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(query)
+                lag = cursor.fetchone()[0]
+            max_lag = self._max_replica_lag
+            usable = lag is not None and (max_lag is None or lag <= max_lag)
+            if not usable:
+                logger.warning('PostgreSQL replica lags %ss behind.' % lag)
+        except psycopg2.Error as e:
+            logger.error(e)
+            usable = False
+        finally:
+            if conn is not None:
+                replica.putconn(conn, close=conn.closed != 0)
+
+        self._replicas_status[id(replica)] = (now, usable)
+        return usable
+
+    @contextlib.contextmanager
+    def connect(self, readonly=False, name=None):
         """Connect to the database and instantiates a cursor.
         At exiting the context manager, a COMMIT is performed on the current
         transaction if everything went well. Otherwise transaction is ROLLBACK,
         and everything cleaned up.
 
         If the database could not be be reached a 503 error is raised.
+
+        If replicas are configured, ``readonly`` cursors are connected to
+        one of them (see :meth:`forget_writes`).
+
+        Within a :meth:`transaction`, the connection pinned for the
+        request is used, and changes are committed at its end.
+
+        :param str name: if specified, a server-side cursor is instantiated,
+            fetching results as they are consumed. It lives within a
+            transaction, even if ``readonly``, hence its name must be unique.
         """
+        pool = self._get_pool(readonly)
+        connections = getattr(self._transaction, 'connections', None)
+        if connections is not None and pool is self.pool:
+            with self._connect_pinned(connections, readonly, name) as cursor:
+                yield cursor
+            if not readonly:
+                self._local.has_written = True
+            return
+
         conn = None
         cursor = None
         try:
-            conn = self.pool.getconn()
-            conn.autocommit = readonly
-            options = dict(cursor_factory=psycopg2.extras.DictCursor)
+            conn = pool.getconn()
+            conn.autocommit = readonly and not name
+            options = dict(cursor_factory=TimeoutCursor)
+            if name:
+                options['name'] = name
+                # A server-side cursor executes a single statement.
+                set_timeout = self._format_timeout()
+                if set_timeout:
+                    with conn.cursor() as timeout_cursor:
+                        timeout_cursor.execute(set_timeout)
             cursor = conn.cursor(**options)
+            if not name:
+                cursor.timeout = self._get_statement_timeout
             # Start context
             yield cursor
             # End context
+            if name:
+                # Server-side cursors are closed within the transaction.
+                cursor.close()
             if not readonly:
                 conn.commit()
+                self._local.has_written = True
+            elif name:
+                conn.commit()
         except psycopg2.Error as e:
-            if cursor:
+            if cursor and cursor.query:
                 logger.debug(cursor.query)
             logger.error(e)
             if conn and not conn.closed:
                 conn.rollback()
-            raise exceptions.BackendError(original=e)
+            raise _backend_error(e)
         finally:
             if cursor:
                 cursor.close()
-            if conn and not conn.closed:
-                self.pool.putconn(conn, close=self._always_close)
+            if conn:
+                close = self._always_close or conn.closed != 0
+                pool.putconn(conn, close=close)
 
 
 class PostgreSQL(PostgreSQLClient, StorageBase):
@@ -129,10 +730,28 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
 
     """
 
-    schema_version = 7
+    schema_version = 14
+
+    prepare_threshold = 3
+    """Number of executions after which a query shape is considered hot,
+    and executed as a server-side prepared statement."""
+
+    max_query_shapes = 500
+    """Maximum number of query shapes kept in cache."""
+
+    _prepared = weakref.WeakKeyDictionary()
+    """Names of the statements prepared on each connection."""
 
     def __init__(self, *args, **kwargs):
         self._max_fetch_size = kwargs.pop('max_fetch_size')
+        self._prepared_statements = kwargs.pop('prepared_statements', True)
+        self._partition_interval = kwargs.pop('deleted_partition_interval',
+                                              'month')
+        self._delete_batch_size = kwargs.pop('delete_batch_size', 0)
+        self._notifications_enabled = kwargs.pop('notifications_enabled',
+                                                 False)
+        self._query_shapes = {}
+        self._unique_indexes = None
         super(PostgreSQL, self).__init__(*args, **kwargs)
 
         # Register ujson, globally for all futur cursors
@@ -141,6 +760,98 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
                                           globally=True,
                                           loads=json.loads)
 
+    def _execute(self, cursor, query, placeholders):
+        """Execute the query, as a server-side prepared statement once its
+        shape is hot (see :meth:`_get_statement`).
+
+        Statements are prepared lazily on each pooled connection, and
+        live as long as it is open.
+        """
+        statement = self._get_statement(query, placeholders)
+        if statement is None:
+            cursor.execute(query, placeholders)
+            return
+
+        name, sql, params_names = statement
+        connection = cursor.connection
+        prepared = self._prepared.setdefault(connection, set())
+        if name not in prepared:
+            cursor.execute('PREPARE %s AS %s' % (name, sql))
+            prepared.add(name)
+
+        if not params_names:
+            cursor.execute('EXECUTE %s;' % name)
+            return
+        params = ', '.join(['%%(%s)s' % holder for holder in params_names])
+        cursor.execute('EXECUTE %s (%s);' % (name, params), placeholders)
+
+    def _get_statement(self, query, placeholders):
+        """Return the prepared statement of this query shape, or ``None``
+        if it should be executed as is (not hot yet, or not eligible).
+
+        The shape of a query is its SQL text, with the collection and the
+        names of fields. They are inlined in the statement in order to let
+        the planner use the partial and expression indices of
+        :meth:`initialize_indexes` in generic plans. Other placeholders
+        (e.g. parent, filters values) become parameters.
+
+        :returns: the statement name, its SQL, and the names of the
+            placeholders given as parameters.
+        :rtype: tuple
+        """
+        if not self._prepared_statements:
+            return None
+
+        # Lists of values (e.g. ``IN``) cannot be given as parameters.
+        if any([isinstance(value, (tuple, list))
+                for value in placeholders.values()]):
+            return None
+
+        shape_holders = dict([(k, v) for k, v in placeholders.items()
+                              if k == 'collection_id' or
+                              _FIELD_HOLDER.match(k)])
+        key = (query,) + tuple(sorted(shape_holders.items()))
+        shape = self._query_shapes.get(key)
+        if shape is None:
+            if len(self._query_shapes) >= self.max_query_shapes:
+                return None
+            shape = self._query_shapes[key] = {'hits': 0, 'statement': None}
+
+        shape['hits'] += 1
+        if shape['hits'] < self.prepare_threshold:
+            return None
+
+        if shape['statement'] is None:
+            digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+            name = 'cliquet_%s' % digest[:16]
+            sql, params_names = self._format_statement(query, shape_holders)
+            shape['statement'] = (name, sql, params_names)
+        return shape['statement']
+
+    def _format_statement(self, query, shape_holders):
+        """Replace the placeholders of the query by ``$n`` parameters,
+        except the shape ones which are safely escaped.
+
+        :returns: the SQL of the statement, and the names of the
+            placeholders given as parameters.
+        :rtype: tuple
+        """
+        params_names = []
+
+        def replace(match):
+            holder = match.group(1)
+            if holder in shape_holders:
+                quoted = psycopg2.extensions.QuotedString(
+                    shape_holders[holder])
+                quoted.encoding = 'utf8'
+                return quoted.getquoted().decode('utf-8')
+            if holder not in params_names:
+                params_names.append(holder)
+            return '$%s' % (params_names.index(holder) + 1)
+
+        sql = _PLACEHOLDER.sub(replace, query)
+        return sql, params_names
+
     def _execute_sql_file(self, filepath):
         here = os.path.abspath(os.path.dirname(__file__))
         schema = open(os.path.join(here, filepath)).read()
@@ -163,6 +874,7 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
             self._execute_sql_file('schema.sql')
             logger.info('Created PostgreSQL storage tables '
                         '(version %s).' % self.schema_version)
+            self._setup_notifications()
             return
 
         logger.debug('Detected PostgreSQL schema version %s.' % version)
@@ -182,6 +894,185 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
             self._execute_sql_file(os.path.join('migrations', filepath))
 
         logger.info('Schema migration done.')
+        self._setup_notifications()
+
+    def _setup_notifications(self):
+        """Install the triggers that notify the changes of records and
+        tombstones if enabled, or remove them otherwise.
+        """
+        query = """
+        DROP TRIGGER IF EXISTS tgr_records_notify ON records;
+        DROP TRIGGER IF EXISTS tgr_deleted_notify ON deleted;
+        """
+        if self._notifications_enabled:
+            query += """
+            CREATE TRIGGER tgr_records_notify
+            AFTER INSERT OR UPDATE ON records
+            FOR EACH ROW EXECUTE PROCEDURE notify_change();
+
+            CREATE TRIGGER tgr_deleted_notify
+            AFTER INSERT ON deleted
+            FOR EACH ROW EXECUTE PROCEDURE notify_change();
+            """
+        with self.connect() as cursor:
+            cursor.execute(query)
+
+    def subscribe_changes(self, callback):
+        """Call `callback` with a :data:`Change` for every record or
+        tombstone written, by any node, once ``storage_notifications_enabled``
+        triggers were installed (see :meth:`initialize_schema`).
+
+        Changes are received asynchronously, from a dedicated thread, and
+        can be missed while its connection is lost: they are meant to
+        invalidate caches early, not to replace their expiration.
+
+        :returns: the subscribed function, to be given to :meth:`unlisten`.
+        """
+        def on_notify(payload):
+            # Parent ids may contain the separator, collection ids do not.
+            parent_id, collection_id, timestamp = payload.rsplit('|', 2)
+            callback(Change(parent_id, collection_id, int(timestamp)))
+
+        self.listen(CHANGES_CHANNEL, on_notify)
+        return on_notify
+
+    def initialize_indexes(self, indexed_fields, unique_fields=None):
+        """Create indices for each record field of the specified
+        collections, and drop the ones that were previously created for
+        fields that are not specified anymore.
+
+        Indices are partial (one per collection). Two are built for each
+        field, on the text and JSONB expressions of filters and sorting, and
+        a GIN index is built on the whole ``data`` of the collection for
+        equality filters.
+
+        A unique index is built for each unique field, so that writes rely
+        on it instead of looking up conflicting records first. It cannot be
+        created if some records of the collection already conflict: the
+        error is logged, and writes keep looking up conflicting records
+        until the conflicts are resolved and indexes are initialized again.
+        """
+        wanted = {}
+        for collection_id, fields in indexed_fields.items():
+            definitions = [('USING GIN (data jsonb_path_ops)', None)]
+            for field in fields:
+                for typed in (False, True):
+                    sql_field = self._format_data_field('field', typed=typed)
+                    definition = '(parent_id, (%s))' % sql_field
+                    definitions.append((definition, field))
+
+            for definition, field in definitions:
+                name = self._index_name(collection_id, definition, field)
+                wanted[name] = (collection_id, definition, field, False)
+
+        for collection_id, fields in (unique_fields or {}).items():
+            for field in fields:
+                name = self._index_name(collection_id, UNIQUE_INDEX, field,
+                                        unique=True)
+                wanted[name] = (collection_id, UNIQUE_INDEX, field, True)
+
+        query = """
+        SELECT indexname
+          FROM pg_indexes
+         WHERE tablename = 'records'
+           AND (indexname LIKE 'idx_records_field_%'
+                OR indexname LIKE 'idx_records_unique_%');
+        """
+        with self.connect() as cursor:
+            cursor.execute(query)
+            existing = set([r['indexname'] for r in cursor.fetchall()])
+
+        for name in sorted(existing - set(wanted.keys())):
+            with self.connect() as cursor:
+                cursor.execute("DROP INDEX IF EXISTS %s;" % name)
+            logger.info('Dropped PostgreSQL index %s.' % name)
+
+        for name in sorted(set(wanted.keys()) - existing):
+            collection_id, definition, field, unique = wanted[name]
+            query = """
+            CREATE %(unique)s INDEX %(name)s
+                ON records %(definition)s
+             WHERE collection_id = %%(collection_id)s
+               %(condition)s;
+            """
+            safeholders = dict(unique='UNIQUE' if unique else '',
+                               name=name,
+                               definition=definition,
+                               condition='')
+            if unique:
+                # Like unicity checks, records without value are ignored.
+                safeholders['condition'] = (
+                    "AND jsonb_typeof(data->%(field)s) <> 'null'")
+            placeholders = dict(collection_id=collection_id, field=field)
+            try:
+                with self.connect() as cursor:
+                    cursor.execute(query % safeholders, placeholders)
+            except exceptions.BackendError as e:
+                if not unique:
+                    raise
+                logger.error('Could not create PostgreSQL unique index on '
+                             '%s %s, unicity is still checked by looking up '
+                             'conflicting records: %s' % (collection_id,
+                                                          field, e))
+                continue
+            logger.info('Created PostgreSQL index %s on %s.' % (
+                name, collection_id))
+
+        # Reload the unique indexes on next write.
+        self._unique_indexes = None
+
+    def _index_name(self, collection_id, definition, field=None,
+                    unique=False):
+        # Collection ids and field names can be longer than the maximum
+        # identifier length, or contain any character.
+        key = '%s:%s:%s' % (collection_id, definition, field or '')
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        kind = 'unique' if unique else 'field'
+        return 'idx_records_%s_%s' % (kind, digest)
+
+    def _has_unique_indexes(self, collection_id, unique_fields):
+        """Return ``True`` if the unicity of every specified field is
+        enforced by a valid unique index (see :meth:`initialize_indexes`).
+        """
+        if not unique_fields:
+            return True
+
+        if self._unique_indexes is None:
+            # Indexes whose creation failed midway are not enforced.
+            query = """
+            SELECT relname AS indexname
+              FROM pg_index
+              JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+             WHERE indrelid = 'records'::regclass
+               AND indisvalid
+               AND indisunique
+               AND relname LIKE 'idx_records_unique_%';
+            """
+            with self.connect(readonly=True) as cursor:
+                cursor.execute(query)
+                self._unique_indexes = set([r['indexname']
+                                            for r in cursor.fetchall()])
+
+        names = [self._index_name(collection_id, UNIQUE_INDEX, field,
+                                  unique=True)
+                 for field in unique_fields]
+        return all([name in self._unique_indexes for name in names])
+
+    def _raise_unicity_error(self, error, collection_id, parent_id, records,
+                             unique_fields, id_field, modified_field,
+                             for_creation=False):
+        """Raise the unicity error of the specified records if the backend
+        `error` is a unique violation, or the backend error otherwise.
+
+        The conflicting record is only looked up once the write failed.
+        """
+        pgcode = getattr(error.original, 'pgcode', None)
+        if pgcode == psycopg2.errorcodes.UNIQUE_VIOLATION:
+            with self.connect() as cursor:
+                self._check_unicity_many(cursor, collection_id, parent_id,
+                                         records, unique_fields, id_field,
+                                         modified_field, for_creation)
+        raise error
 
     def _check_database_timezone(self):
         # Make sure database has UTC timezone.
@@ -223,7 +1114,7 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
         SELECT value AS version
           FROM metadata
          WHERE name = 'storage_schema_version'
-         ORDER BY value DESC;
+         ORDER BY value::INTEGER DESC;
         """
         with self.connect() as cursor:
             cursor.execute(query)
@@ -249,6 +1140,8 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
         query = """
         DELETE FROM deleted;
         DELETE FROM records;
+        DELETE FROM collection_counts;
+        DELETE FROM timestamps;
         DELETE FROM metadata;
         """
         with self.connect() as cursor:
@@ -278,29 +1171,88 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
         INSERT INTO records (id, parent_id, collection_id, data)
         VALUES (%(object_id)s, %(parent_id)s,
                 %(collection_id)s, %(data)s::JSONB)
-        RETURNING id, as_epoch(last_modified) AS last_modified;
+        RETURNING id, last_modified;
         """
         placeholders = dict(object_id=record_id,
                             parent_id=parent_id,
                             collection_id=collection_id,
                             data=json.dumps(record))
-        with self.connect() as cursor:
-            # Check that it does violate the resource unicity rules.
-            self._check_unicity(cursor, collection_id, parent_id, record,
-                                unique_fields, id_field, modified_field,
-                                for_creation=True)
-            cursor.execute(query, placeholders)
-            inserted = cursor.fetchone()
+        indexed = self._has_unique_indexes(collection_id, unique_fields)
+        try:
+            with self.connect() as cursor:
+                if not indexed:
+                    # Check that it does violate the resource unicity rules.
+                    self._check_unicity(cursor, collection_id, parent_id,
+                                        record, unique_fields, id_field,
+                                        modified_field, for_creation=True)
+                cursor.execute(query, placeholders)
+                inserted = cursor.fetchone()
+        except exceptions.BackendError as e:
+            self._raise_unicity_error(e, collection_id, parent_id, [record],
+                                      unique_fields, id_field, modified_field,
+                                      for_creation=True)
 
         record[modified_field] = inserted['last_modified']
         return record
 
+    def create_many(self, collection_id, parent_id, records,
+                    id_generator=None, unique_fields=None,
+                    id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        id_generator = id_generator or self.id_generator
+        records = [record.copy() for record in records]
+        for record in records:
+            record.setdefault(id_field, id_generator())
+
+        query = """
+        INSERT INTO records (id, parent_id, collection_id, data)
+        VALUES %(values)s
+        RETURNING id, last_modified;
+        """
+        indexed = self._has_unique_indexes(collection_id, unique_fields)
+        try:
+            with self.connect() as cursor:
+                if not indexed:
+                    # Check that none violates the resource unicity rules.
+                    self._check_unicity_many(cursor, collection_id,
+                                             parent_id, records,
+                                             unique_fields, id_field,
+                                             modified_field,
+                                             for_creation=True)
+
+                # Multi-rows statements, ``bump_timestamp()`` being
+                # triggered for each row.
+                for chunk in _chunks(records, BULK_CHUNK_SIZE):
+                    placeholders = dict(parent_id=parent_id,
+                                        collection_id=collection_id)
+                    values = []
+                    for i, record in enumerate(chunk):
+                        values.append("(%%(id_%s)s, %%(parent_id)s, "
+                                      "%%(collection_id)s, "
+                                      "%%(data_%s)s::JSONB)" % (i, i))
+                        placeholders['id_%s' % i] = record[id_field]
+                        placeholders['data_%s' % i] = json.dumps(record)
+
+                    safeholders = dict(values=', '.join(values))
+                    cursor.execute(query % safeholders, placeholders)
+                    inserted = dict([(r['id'], r['last_modified'])
+                                     for r in cursor.fetchall()])
+                    for record in chunk:
+                        record[modified_field] = inserted[record[id_field]]
+        except exceptions.BackendError as e:
+            self._raise_unicity_error(e, collection_id, parent_id, records,
+                                      unique_fields, id_field, modified_field,
+                                      for_creation=True)
+
+        return records
+
     def get(self, collection_id, parent_id, object_id,
             id_field=DEFAULT_ID_FIELD,
             modified_field=DEFAULT_MODIFIED_FIELD,
             auth=None):
         query = """
-        SELECT as_epoch(last_modified) AS last_modified, data
+        SELECT last_modified, data
           FROM records
          WHERE id = %(object_id)s
            AND parent_id = %(parent_id)s
@@ -325,19 +1277,31 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
                unique_fields=None, id_field=DEFAULT_ID_FIELD,
                modified_field=DEFAULT_MODIFIED_FIELD,
                auth=None):
-        query_create = """
-        INSERT INTO records (id, parent_id, collection_id, data)
-        VALUES (%(object_id)s, %(parent_id)s,
-                %(collection_id)s, %(data)s::JSONB)
-        RETURNING as_epoch(last_modified) AS last_modified;
+        # Create or update, in a single statement.
+        query = """
+        SELECT upsert_record(%(object_id)s, %(parent_id)s,
+                             %(collection_id)s, %(data)s::JSONB)
+                 AS last_modified,
+               NULL AS conflict_id;
         """
 
-        query_update = """
-        UPDATE records SET data=%(data)s::JSONB
-        WHERE id = %(object_id)s
-           AND parent_id = %(parent_id)s
-           AND collection_id = %(collection_id)s
-        RETURNING as_epoch(last_modified) AS last_modified;
+        # If a record violates the resource unicity rules, nothing is
+        # written and it is returned instead.
+        query_unicity = """
+        WITH conflicting AS (
+            SELECT id, last_modified, data
+              FROM records
+             WHERE %(conflicting_filter)s
+             LIMIT 1
+        )
+        SELECT upsert_record(%%(object_id)s, %%(parent_id)s,
+                             %%(collection_id)s, %%(data)s::JSONB)
+                 AS last_modified,
+               NULL::TEXT AS conflict_id, NULL::JSONB AS conflict_data
+         WHERE NOT EXISTS (SELECT id FROM conflicting)
+         UNION ALL
+        SELECT last_modified, id, data
+          FROM conflicting;
         """
         placeholders = dict(object_id=object_id,
                             parent_id=parent_id,
@@ -347,33 +1311,102 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
         record = record.copy()
         record[id_field] = object_id
 
-        with self.connect() as cursor:
-            # Check that it does violate the resource unicity rules.
-            self._check_unicity(cursor, collection_id, parent_id, record,
-                                unique_fields, id_field, modified_field)
-            # Create or update ?
-            query = """
-            SELECT id FROM records
-            WHERE id = %(object_id)s
-              AND parent_id = %(parent_id)s
-              AND collection_id = %(collection_id)s;
-            """
-            cursor.execute(query, placeholders)
-            query = query_update if cursor.rowcount > 0 else query_create
+        # Check that it does violate the resource unicity rules, unless
+        # enforced by indexes.
+        indexed = self._has_unique_indexes(collection_id, unique_fields)
+        conflicting = None
+        if not indexed:
+            conflicting = self._format_unicity(collection_id, parent_id,
+                                               record, unique_fields,
+                                               id_field, modified_field)
+        if conflicting:
+            sql, holders = conflicting
+            query = query_unicity % dict(conflicting_filter=sql)
+            placeholders.update(**holders)
 
-            cursor.execute(query, placeholders)
-            result = cursor.fetchone()
+        try:
+            with self.connect() as cursor:
+                cursor.execute(query, placeholders)
+                result = cursor.fetchone()
+        except exceptions.BackendError as e:
+            self._raise_unicity_error(e, collection_id, parent_id, [record],
+                                      unique_fields, id_field, modified_field)
+
+        if result['conflict_id'] is not None:
+            existing = result['conflict_data']
+            existing[id_field] = result['conflict_id']
+            existing[modified_field] = result['last_modified']
+            field = _conflicting_field(record, existing, unique_fields)
+            raise exceptions.UnicityError(field, existing)
 
         record[modified_field] = result['last_modified']
         return record
 
+    def update_many(self, collection_id, parent_id, records,
+                    unique_fields=None, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        records = [record.copy() for record in records]
+
+        # Create or update each row (see ``update()``).
+        query = """
+        SELECT v.id, upsert_record(v.id, %%(parent_id)s,
+                                   %%(collection_id)s, v.data::JSONB)
+                       AS last_modified
+          FROM (VALUES %(values)s) AS v(id, data);
+        """
+        indexed = self._has_unique_indexes(collection_id, unique_fields)
+        try:
+            with self.connect() as cursor:
+                if not indexed:
+                    # Check that none violates the resource unicity rules.
+                    self._check_unicity_many(cursor, collection_id,
+                                             parent_id, records,
+                                             unique_fields, id_field,
+                                             modified_field)
+
+                for chunk in _chunks(records, BULK_CHUNK_SIZE):
+                    placeholders = dict(parent_id=parent_id,
+                                        collection_id=collection_id)
+                    values = []
+                    for i, record in enumerate(chunk):
+                        values.append("(%%(id_%s)s::TEXT, %%(data_%s)s)"
+                                      % (i, i))
+                        placeholders['id_%s' % i] = record[id_field]
+                        placeholders['data_%s' % i] = json.dumps(record)
+
+                    safeholders = dict(values=', '.join(values))
+                    cursor.execute(query % safeholders, placeholders)
+                    updated = dict([(r['id'], r['last_modified'])
+                                    for r in cursor.fetchall()])
+                    for record in chunk:
+                        record[modified_field] = updated[record[id_field]]
+        except exceptions.BackendError as e:
+            self._raise_unicity_error(e, collection_id, parent_id, records,
+                                      unique_fields, id_field, modified_field)
+
+        return records
+
     def delete(self, collection_id, parent_id, object_id,
                id_field=DEFAULT_ID_FIELD, with_deleted=True,
                modified_field=DEFAULT_MODIFIED_FIELD,
                deleted_field=DEFAULT_DELETED_FIELD,
                auth=None):
         if with_deleted:
+            # Tombstones of previous deletions are not unique anymore
+            # once partitioned, hence replace them explicitly.
             query = """
+            DELETE
+            FROM deleted
+            WHERE id = %(object_id)s
+              AND parent_id = %(parent_id)s
+              AND collection_id = %(collection_id)s
+              AND EXISTS (SELECT 1
+                            FROM records
+                           WHERE id = %(object_id)s
+                             AND parent_id = %(parent_id)s
+                             AND collection_id = %(collection_id)s);
+
             WITH deleted_record AS (
                 DELETE
                 FROM records
@@ -382,10 +1415,12 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
                   AND collection_id = %(collection_id)s
                 RETURNING id
             )
-            INSERT INTO deleted (id, parent_id, collection_id)
-            SELECT id, %(parent_id)s, %(collection_id)s
+            INSERT INTO deleted (id, parent_id, collection_id, last_modified)
+            SELECT id, %(parent_id)s, %(collection_id)s,
+                   as_epoch(bump_collection_timestamp(%(parent_id)s,
+                                                      %(collection_id)s))
               FROM deleted_record
-            RETURNING as_epoch(last_modified) AS last_modified;
+            RETURNING last_modified;
             """
         else:
             query = """
@@ -394,7 +1429,7 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
                 WHERE id = %(object_id)s
                   AND parent_id = %(parent_id)s
                   AND collection_id = %(collection_id)s
-                RETURNING as_epoch(last_modified) AS last_modified;
+                RETURNING last_modified;
             """
         placeholders = dict(object_id=object_id,
                             parent_id=parent_id,
@@ -420,6 +1455,16 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
                    auth=None):
         if with_deleted:
             query = """
+            DELETE
+            FROM deleted
+            WHERE parent_id = %%(parent_id)s
+              AND collection_id = %%(collection_id)s
+              AND id IN (SELECT id
+                           FROM records
+                          WHERE parent_id = %%(parent_id)s
+                            AND collection_id = %%(collection_id)s
+                            %(conditions_filter)s);
+
             WITH deleted_records AS (
                 DELETE
                 FROM records
@@ -428,10 +1473,12 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
                   %(conditions_filter)s
                 RETURNING id
             )
-            INSERT INTO deleted (id, parent_id, collection_id)
-            SELECT id, %%(parent_id)s, %%(collection_id)s
+            INSERT INTO deleted (id, parent_id, collection_id, last_modified)
+            SELECT id, %%(parent_id)s, %%(collection_id)s,
+                   as_epoch(bump_collection_timestamp(%%(parent_id)s,
+                                                      %%(collection_id)s))
               FROM deleted_records
-            RETURNING id, as_epoch(last_modified) AS last_modified;
+            RETURNING id, last_modified;
             """
         else:
             query = """
@@ -440,7 +1487,7 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
                 WHERE parent_id = %%(parent_id)s
                   AND collection_id = %%(collection_id)s
                   %(conditions_filter)s
-                RETURNING id, as_epoch(last_modified) AS last_modified;
+                RETURNING id, last_modified;
             """
         id_field = id_field or self.id_field
         modified_field = modified_field or self.modified_field
@@ -456,9 +1503,12 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
             safeholders['conditions_filter'] = 'AND %s' % safe_sql
             placeholders.update(**holders)
 
-        with self.connect() as cursor:
-            cursor.execute(query % safeholders, placeholders)
-            results = cursor.fetchmany(self._max_fetch_size)
+        if self._delete_batch_size:
+            results = self._delete_by_batches(query, safeholders, placeholders)
+        else:
+            with self.connect() as cursor:
+                cursor.execute(query % safeholders, placeholders)
+                results = cursor.fetchmany(self._max_fetch_size)
 
         records = []
         for result in results:
@@ -470,6 +1520,48 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
 
         return records
 
+    def _delete_by_batches(self, query, safeholders, placeholders):
+        """Run the specified deletion query on batches of records, in the
+        order of their ids, each batch being committed separately (unless
+        within a request :meth:`transaction`).
+
+        Row locks are thus held for a batch only, and the results of every
+        batch are returned, regardless of ``storage_max_fetch_size``.
+        """
+        select = """
+        SELECT id
+          FROM records
+         WHERE parent_id = %%(parent_id)s
+           AND collection_id = %%(collection_id)s
+           AND id > %%(last_id)s
+           %(conditions_filter)s
+         ORDER BY id
+         LIMIT %%(batch_size)s
+           FOR UPDATE;
+        """
+        batch_safeholders = safeholders.copy()
+        batch_safeholders['conditions_filter'] += ' AND id IN %(batch_ids)s'
+        placeholders = dict(placeholders, batch_size=self._delete_batch_size)
+
+        results = []
+        last_id = ''
+        while True:
+            with self.connect() as cursor:
+                placeholders['last_id'] = last_id
+                cursor.execute(select % safeholders, placeholders)
+                ids = tuple(row['id'] for row in cursor.fetchall())
+                if not ids:
+                    break
+                placeholders['batch_ids'] = ids
+                cursor.execute(query % batch_safeholders, placeholders)
+                results.extend(cursor.fetchall())
+
+            if len(ids) < self._delete_batch_size:
+                break
+            last_id = ids[-1]
+
+        return results
+
     def purge_deleted(self, collection_id, parent_id, before=None,
                       id_field=DEFAULT_ID_FIELD,
                       modified_field=DEFAULT_MODIFIED_FIELD,
@@ -490,7 +1582,7 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
 
         if before is not None:
             safeholders['conditions_filter'] = (
-                'AND as_epoch(last_modified) < %(before)s')
+                'AND last_modified < %(before)s')
             placeholders['before'] = before
 
         with self.connect() as cursor:
@@ -498,19 +1590,112 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
 
         return cursor.rowcount
 
+    def expire_deleted(self, before, auth=None):
+        """Delete the tombstones of every collection older than `before`.
+
+        Since PostgreSQL 11, tombstones are partitioned by period (see
+        ``storage_deleted_partition_interval`` setting): the partitions
+        that ended before `before` are dropped entirely, and those of the
+        current and next periods are created if missing.
+        """
+        query = """
+        SELECT relkind = 'p' AS partitioned
+          FROM pg_class
+         WHERE oid = 'deleted'::regclass;
+        """
+        with self.connect() as cursor:
+            cursor.execute(query)
+            partitioned = cursor.fetchone()['partitioned']
+
+            if partitioned:
+                self._drop_deleted_partitions(cursor, before)
+                self._create_deleted_partitions(cursor)
+                table = 'deleted_default'
+            else:
+                table = 'deleted'
+
+            # Tombstones that do not fall in any partition.
+            query = """
+            DELETE
+            FROM %(table)s
+            WHERE last_modified < %%(before)s;
+            """
+            cursor.execute(query % dict(table=table), dict(before=before))
+
+    def _get_deleted_partitions(self, cursor):
+        """Return the bounds of the tombstones partitions, by table name."""
+        query = """
+        SELECT relname
+          FROM pg_inherits JOIN pg_class ON oid = inhrelid
+         WHERE inhparent = 'deleted'::regclass;
+        """
+        cursor.execute(query)
+        partitions = {}
+        for row in cursor.fetchall():
+            matched = _PARTITION_NAME.match(row['relname'])
+            if matched:
+                start, end = [datetime.datetime.strptime(d, '%Y%m%d')
+                              for d in matched.groups()]
+                partitions[row['relname']] = (start, end)
+        return partitions
+
+    def _drop_deleted_partitions(self, cursor, before):
+        partitions = self._get_deleted_partitions(cursor)
+        for name, (start, end) in sorted(partitions.items()):
+            if _as_epoch(end) <= before:
+                cursor.execute('DROP TABLE %s;' % name)
+                logger.info('Dropped tombstones partition %s.' % name)
+
+    def _create_deleted_partitions(self, cursor):
+        cursor.execute('SELECT localtimestamp AS now;')
+        now = cursor.fetchone()['now']
+        current = _partition_bounds(now, self._partition_interval)
+        upcoming = _partition_bounds(current[1], self._partition_interval)
+
+        partitions = self._get_deleted_partitions(cursor)
+        for start, end in (current, upcoming):
+            overlaps = [name for name, (lower, upper) in partitions.items()
+                        if lower < end and start < upper]
+            if overlaps:
+                continue
+
+            # Tombstones of this period may have been stored in the default
+            # partition already: move them before attaching the new one.
+            # The default partition is locked until the end of transaction,
+            # so that no tombstone of this period is inserted meanwhile
+            # (which would make the attachment fail).
+            query = """
+            CREATE TABLE %(name)s (LIKE deleted INCLUDING DEFAULTS);
+
+            LOCK TABLE deleted_default IN ACCESS EXCLUSIVE MODE;
+
+            WITH moved AS (
+                DELETE
+                FROM deleted_default
+                WHERE last_modified >= %%(start)s
+                  AND last_modified < %%(end)s
+                RETURNING *
+            )
+            INSERT INTO %(name)s SELECT * FROM moved;
+
+            ALTER TABLE deleted ATTACH PARTITION %(name)s
+                FOR VALUES FROM (%%(start)s) TO (%%(end)s);
+            """
+            name = 'deleted_%s_%s' % (start.strftime('%Y%m%d'),
+                                      end.strftime('%Y%m%d'))
+            bounds = dict(start=_as_epoch(start), end=_as_epoch(end))
+            cursor.execute(query % dict(name=name), bounds)
+            logger.info('Created tombstones partition %s.' % name)
+
     def get_all(self, collection_id, parent_id, filters=None, sorting=None,
                 pagination_rules=None, limit=None, include_deleted=False,
                 id_field=DEFAULT_ID_FIELD,
                 modified_field=DEFAULT_MODIFIED_FIELD,
                 deleted_field=DEFAULT_DELETED_FIELD,
-                auth=None):
+                auth=None, raw=False):
         query = """
         WITH total_filtered AS (
-            SELECT COUNT(id) AS count
-              FROM records
-             WHERE parent_id = %%(parent_id)s
-               AND collection_id = %%(collection_id)s
-               %(conditions_filter)s
+            %(count_total)s
         ),
         collection_filtered AS (
             SELECT id, last_modified, data
@@ -518,7 +1703,9 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
              WHERE parent_id = %%(parent_id)s
                AND collection_id = %%(collection_id)s
                %(conditions_filter)s
-             LIMIT %(max_fetch_size)s
+               %(pagination_rules)s
+             %(sorting)s
+             LIMIT %(page_limit)s
         ),
         fake_deleted AS (
             SELECT %%(deleted_field)s::JSONB AS data
@@ -529,24 +1716,20 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
              WHERE parent_id = %%(parent_id)s
                AND collection_id = %%(collection_id)s
                %(conditions_filter)s
-               %(deleted_limit)s
+               %(pagination_rules)s
+             %(sorting)s
+             LIMIT %(deleted_limit)s
         ),
         all_records AS (
             SELECT * FROM filtered_deleted
              UNION ALL
             SELECT * FROM collection_filtered
-        ),
-        paginated_records AS (
-            SELECT DISTINCT id
-              FROM all_records
-              %(pagination_rules)s
         )
         SELECT total_filtered.count AS count_total,
-               a.id, as_epoch(a.last_modified) AS last_modified, a.data
-          FROM paginated_records AS p JOIN all_records AS a ON (a.id = p.id),
-               total_filtered
+               a.id, a.last_modified, %(data)s AS data
+          FROM all_records AS a, total_filtered
           %(sorting)s
-          %(pagination_limit)s;
+         LIMIT %(page_limit)s;
         """
         deleted_field = json.dumps(dict([(deleted_field, True)]))
 
@@ -557,7 +1740,33 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
 
         # Safe strings
         safeholders = defaultdict(six.text_type)
-        safeholders['max_fetch_size'] = self._max_fetch_size
+        safeholders['data'] = 'a.data'
+
+        if raw:
+            # Records are serialized by PostgreSQL, and returned as is.
+            safeholders['data'] = """
+               (a.data || jsonb_build_object(%(id_field)s::TEXT, a.id,
+                                             %(modified_field)s::TEXT,
+                                             a.last_modified))::TEXT"""
+            placeholders.update(id_field=id_field,
+                                modified_field=modified_field)
+
+        # Records of the page are fetched straight from the storage: each
+        # subquery is sorted and limited, the union being sorted again.
+        page_limit = self._max_fetch_size
+        if limit:
+            assert isinstance(limit, six.integer_types)  # asserted in resource
+            page_limit = min(limit, page_limit)
+        safeholders['page_limit'] = page_limit
+        safeholders['deleted_limit'] = page_limit if include_deleted else 0
+
+        # Without filters, the number of records is maintained by triggers.
+        safeholders['count_total'] = """
+            SELECT coalesce((SELECT count
+                               FROM collection_counts
+                              WHERE parent_id = %(parent_id)s
+                                AND collection_id = %(collection_id)s),
+                            0) AS count"""
 
         if filters:
             safe_sql, holders = self._format_conditions(filters,
@@ -565,9 +1774,12 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
                                                         modified_field)
             safeholders['conditions_filter'] = 'AND %s' % safe_sql
             placeholders.update(**holders)
-
-        if not include_deleted:
-            safeholders['deleted_limit'] = 'LIMIT 0'
+            safeholders['count_total'] = """
+            SELECT COUNT(id) AS count
+              FROM records
+             WHERE parent_id = %%(parent_id)s
+               AND collection_id = %%(collection_id)s
+               AND %s""" % safe_sql
 
         if sorting:
             sql, holders = self._format_sorting(sorting, id_field,
@@ -578,15 +1790,11 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
         if pagination_rules:
             sql, holders = self._format_pagination(pagination_rules, id_field,
                                                    modified_field)
-            safeholders['pagination_rules'] = 'WHERE %s' % sql
+            safeholders['pagination_rules'] = 'AND (%s)' % sql
             placeholders.update(**holders)
 
-        if limit:
-            assert isinstance(limit, six.integer_types)  # asserted in resource
-            safeholders['pagination_limit'] = 'LIMIT %s' % limit
-
         with self.connect(readonly=True) as cursor:
-            cursor.execute(query % safeholders, placeholders)
+            self._execute(cursor, query % safeholders, placeholders)
             results = cursor.fetchmany(self._max_fetch_size)
 
         if not len(results):
@@ -594,6 +1802,10 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
 
         count_total = results[0]['count_total']
 
+        if raw:
+            records = [RawJSON(result['data']) for result in results]
+            return records, count_total
+
         records = []
         for result in results:
             record = result['data']
@@ -603,6 +1815,93 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
 
         return records, count_total
 
+    def iter_all(self, collection_id, parent_id, filters=None, sorting=None,
+                 include_deleted=False, id_field=DEFAULT_ID_FIELD,
+                 modified_field=DEFAULT_MODIFIED_FIELD,
+                 deleted_field=DEFAULT_DELETED_FIELD,
+                 auth=None):
+        query = """
+        WITH fake_deleted AS (
+            SELECT %%(deleted_field)s::JSONB AS data
+        ),
+        all_records AS (
+            SELECT id, last_modified, fake_deleted.data AS data
+              FROM deleted, fake_deleted
+             WHERE %%(include_deleted)s
+               AND parent_id = %%(parent_id)s
+               AND collection_id = %%(collection_id)s
+               %(conditions_filter)s
+             UNION ALL
+            SELECT id, last_modified, data
+              FROM records
+             WHERE parent_id = %%(parent_id)s
+               AND collection_id = %%(collection_id)s
+               %(conditions_filter)s
+        )
+        SELECT id, last_modified, data
+          FROM all_records
+          %(sorting)s;
+        """
+        deleted_field = json.dumps(dict([(deleted_field, True)]))
+
+        # Unsafe strings escaped by PostgreSQL
+        placeholders = dict(parent_id=parent_id,
+                            collection_id=collection_id,
+                            deleted_field=deleted_field,
+                            include_deleted=include_deleted)
+
+        # Safe strings
+        safeholders = defaultdict(six.text_type)
+
+        if filters:
+            safe_sql, holders = self._format_conditions(filters,
+                                                        id_field,
+                                                        modified_field)
+            safeholders['conditions_filter'] = 'AND %s' % safe_sql
+            placeholders.update(**holders)
+
+        if sorting:
+            sql, holders = self._format_sorting(sorting, id_field,
+                                                modified_field)
+            safeholders['sorting'] = sql
+            placeholders.update(**holders)
+
+        # Records are fetched by chunks from a server-side cursor, whose
+        # name is unique among the ones iterated concurrently.
+        name = 'iter_all_%s' % uuid.uuid4().hex
+        with self.connect(readonly=True, name=name) as cursor:
+            cursor.execute(query % safeholders, placeholders)
+            while True:
+                results = cursor.fetchmany(self._max_fetch_size)
+                if not results:
+                    break
+                for result in results:
+                    record = result['data']
+                    record[id_field] = result['id']
+                    record[modified_field] = result['last_modified']
+                    yield record
+
+    def _format_data_field(self, field_holder, typed=False):
+        """Format the SQL expression of a record field, with a placeholder
+        for its name.
+
+        .. note::
+
+            Filters, sorting and indices share the exact same expressions,
+            in order to let the planner use the indices of
+            :meth:`initialize_indexes`.
+
+        :param bool typed: if ``True``, the field is compared as JSONB
+            (e.g. numbers are compared numerically) instead of text.
+        """
+        if typed:
+            # JSON operator -> retrieves values as JSONB.
+            # If field is missing, records are sorted last (NULL).
+            return "data->%%(%s)s" % field_holder
+        # JSON operator ->> retrieves values as text.
+        # If field is missing, we default to ''.
+        return "coalesce(data->>%%(%s)s, '')" % field_holder
+
     def _format_conditions(self, filters, id_field, modified_field,
                            prefix='filters'):
         """Format the filters list in SQL, with placeholders for safe escaping.
@@ -614,6 +1913,14 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
 
             Field name and value are escaped as they come from HTTP API.
 
+        .. note::
+
+            Equality on record fields is expressed as a JSONB containment
+            (e.g. ``data @> '{"age": 42}'``), that can be looked up in a
+            GIN index on ``data``. Like when values were compared as text,
+            scalars also match their string form (e.g. ``?age=42`` matches
+            ``"42"``, and ``?age="42"`` matches ``42``).
+
         :returns: A SQL string with placeholders, and a dict mapping
             placeholders to actual values.
         :rtype: tuple
@@ -628,39 +1935,135 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
         conditions = []
         holders = {}
         for i, filtr in enumerate(filters):
-            value = filtr.value
-
-            if filtr.field == id_field:
-                sql_field = 'id'
-            elif filtr.field == modified_field:
-                sql_field = 'as_epoch(last_modified)'
-            else:
-                # Safely escape field name
-                field_holder = '%s_field_%s' % (prefix, i)
-                holders[field_holder] = filtr.field
-                # JSON operator ->> retrieves values as text.
-                # If field is missing, we default to ''.
-                sql_field = "coalesce(data->>%%(%s)s, '')" % field_holder
-
-            if filtr.operator not in (COMPARISON.IN, COMPARISON.EXCLUDE):
-                # For the IN operator, let psycopg escape the values list.
-                # Otherwise JSON-ify the native value (e.g. True -> 'true')
-                if not isinstance(filtr.value, six.string_types):
-                    value = json.dumps(filtr.value).strip('"')
-            else:
-                value = tuple(value)
+            is_data_field = filtr.field not in (id_field, modified_field)
+            # Empty string also matches records where the field is missing.
+            if (is_data_field and filtr.operator == COMPARISON.EQ and
+                    filtr.value != ''):
+                cond, filter_holders = self._format_containment(filtr,
+                                                                prefix, i)
+                holders.update(**filter_holders)
+                conditions.append(cond)
+                continue
 
-            # Safely escape value
-            value_holder = '%s_value_%s' % (prefix, i)
-            holders[value_holder] = value
+            sql_field, sql_value, filter_holders = self._format_filter(
+                filtr, id_field, modified_field, prefix, i)
+            holders.update(**filter_holders)
 
             sql_operator = operators.setdefault(filtr.operator, filtr.operator)
-            cond = "%s %s %%(%s)s" % (sql_field, sql_operator, value_holder)
+            cond = "%s %s %s" % (sql_field, sql_operator, sql_value)
+            if is_data_field and self._is_numeric_comparison(filtr):
+                # JSONB also orders values of other types (e.g. strings are
+                # greater than numbers, and null lower).
+                cond = "(jsonb_typeof(%s) = 'number' AND %s)" % (sql_field,
+                                                                 cond)
             conditions.append(cond)
 
         safe_sql = ' AND '.join(conditions)
         return safe_sql, holders
 
+    def _format_containment(self, filtr, prefix, index):
+        """Format an equality filter on a record field as a JSONB
+        containment, with placeholders for safe escaping.
+
+        Scalar values also match their alternative form, i.e. numbers,
+        booleans and ``null`` their string, and strings the JSON value
+        they represent.
+
+        :returns: A SQL string with placeholders, and a dict mapping
+            placeholders to actual values.
+        :rtype: tuple
+        """
+        value = filtr.value
+        alternatives = [value]
+        if isinstance(value, six.string_types):
+            try:
+                parsed = json.loads(value)
+            except ValueError:
+                parsed = value
+            scalar = not isinstance(parsed, (six.string_types, list, dict))
+            # Infinity and NaN are not valid JSON.
+            if isinstance(parsed, float):
+                scalar = abs(parsed) < float('inf')
+            if scalar:
+                alternatives.append(parsed)
+        elif not isinstance(value, (list, dict)):
+            alternatives.append(json.dumps(value))
+
+        holders = {}
+        conditions = []
+        for j, alternative in enumerate(alternatives):
+            value_holder = '%s_value_%s' % (prefix, index)
+            if j > 0:
+                value_holder = '%s_alternative_%s' % (prefix, index)
+            holders[value_holder] = json.dumps({filtr.field: alternative})
+            conditions.append("data @> %%(%s)s::JSONB" % value_holder)
+
+        if len(conditions) == 1:
+            return conditions[0], holders
+        return '(%s)' % ' OR '.join(conditions), holders
+
+    def _is_numeric_comparison(self, filtr):
+        """Return ``True`` if the specified filter is an inequality with a
+        number.
+        """
+        value = filtr.value
+        is_number = (isinstance(value, (six.integer_types, float)) and
+                     not isinstance(value, bool))
+        return is_number and filtr.operator in (COMPARISON.LT,
+                                                COMPARISON.MIN,
+                                                COMPARISON.MAX,
+                                                COMPARISON.GT)
+
+    def _format_filter(self, filtr, id_field, modified_field, prefix, index):
+        """Format the field of the specified filter as a SQL expression,
+        and its value as a placeholder.
+
+        .. note::
+
+            Record fields are compared as JSONB when the filter value is
+            a number and the operator an inequality, in order to compare
+            them numerically (e.g. ``10 > 9``). Only numbers match these
+            filters (see :meth:`_format_conditions`).
+
+        :returns: A SQL string with placeholders for the field and for
+            the value, and a dict mapping placeholders to actual values.
+        :rtype: tuple
+        """
+        holders = {}
+        value = filtr.value
+        value_holder = '%s_value_%s' % (prefix, index)
+        sql_value = '%%(%s)s' % value_holder
+
+        typed = self._is_numeric_comparison(filtr)
+
+        if filtr.field == id_field:
+            sql_field = 'id'
+            typed = False
+        elif filtr.field == modified_field:
+            sql_field = 'last_modified'
+            typed = False
+        else:
+            # Safely escape field name
+            field_holder = '%s_field_%s' % (prefix, index)
+            holders[field_holder] = filtr.field
+            sql_field = self._format_data_field(field_holder, typed=typed)
+
+        if typed:
+            value = json.dumps(value)
+            sql_value = '%s::JSONB' % sql_value
+        elif filtr.operator not in (COMPARISON.IN, COMPARISON.EXCLUDE):
+            # For the IN operator, let psycopg escape the values list.
+            # Otherwise JSON-ify the native value (e.g. True -> 'true')
+            if not isinstance(filtr.value, six.string_types):
+                value = json.dumps(filtr.value).strip('"')
+        else:
+            value = tuple(value)
+
+        # Safely escape value
+        holders[value_holder] = value
+
+        return sql_field, sql_value, holders
+
     def _format_pagination(self, pagination_rules, id_field, modified_field):
         """Format the pagination rules in SQL, with placeholders for
         safe escaping.
@@ -669,6 +2072,21 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
 
             All rules are combined using OR.
 
+        .. note::
+
+            If the rules are the expansion of the sorting fields values of
+            a single record (like the ones built by the resource from the
+            pagination token), they are compiled into one row-value
+            comparison (e.g. ``(a, b) < (%s, %s)``), that the planner can
+            use to seek the page from an index matching the ``ORDER BY``.
+
+        .. note::
+
+            Record fields are compared with the same expressions as in
+            :meth:`_format_sorting`, so that pages follow the sorting
+            order, and records that miss a field (``None`` values) are
+            considered greater than the others, like ``NULL`` values.
+
         .. note::
 
             Field names are escaped as they come from HTTP API.
@@ -677,21 +2095,170 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
             placeholders to actual values.
         :rtype: tuple
         """
+        keyset = self._extract_keyset(pagination_rules, id_field,
+                                      modified_field)
+        if keyset is not None:
+            return self._format_keyset(keyset, id_field, modified_field)
+
         rules = []
         placeholders = {}
 
         for i, rule in enumerate(pagination_rules):
             prefix = 'rules_%s' % i
-            safe_sql, holders = self._format_conditions(rule,
-                                                        id_field,
-                                                        modified_field,
-                                                        prefix=prefix)
+            safe_sql, holders = self._format_pagination_rule(rule,
+                                                             id_field,
+                                                             modified_field,
+                                                             prefix=prefix)
             rules.append(safe_sql)
             placeholders.update(**holders)
 
         safe_sql = ' OR '.join(['(%s)' % r for r in rules])
         return safe_sql, placeholders
 
+    def _format_pagination_rule(self, rule, id_field, modified_field,
+                                prefix):
+        """Format the filters of a pagination rule in SQL, combined using
+        AND, with placeholders for safe escaping.
+
+        :returns: A SQL string with placeholders, and a dict mapping
+            placeholders to actual values.
+        :rtype: tuple
+        """
+        operators = {
+            COMPARISON.EQ: '=',
+            COMPARISON.LT: '<',
+            COMPARISON.GT: '>',
+        }
+
+        conditions = []
+        holders = {}
+        for i, filtr in enumerate(rule):
+            if filtr.operator not in operators:
+                cond, filter_holders = self._format_conditions(
+                    [filtr], id_field, modified_field, prefix='%s_%s' % (
+                        prefix, i))
+                holders.update(**filter_holders)
+                conditions.append(cond)
+                continue
+
+            sql_field, sql_value, filter_holders = self._format_sorted_filter(
+                filtr, id_field, modified_field, prefix, i)
+            holders.update(**filter_holders)
+
+            is_data_field = filtr.field not in (id_field, modified_field)
+            if is_data_field and filtr.value is None:
+                # Missing values are the greatest ones.
+                cond = {
+                    COMPARISON.EQ: '%s IS NULL' % sql_field,
+                    COMPARISON.LT: '%s IS NOT NULL' % sql_field,
+                    COMPARISON.GT: 'FALSE',
+                }[filtr.operator]
+            else:
+                sql_operator = operators[filtr.operator]
+                cond = "%s %s %s" % (sql_field, sql_operator, sql_value)
+                if is_data_field and filtr.operator == COMPARISON.GT:
+                    cond = "(%s OR %s IS NULL)" % (cond, sql_field)
+            conditions.append(cond)
+
+        safe_sql = ' AND '.join(conditions)
+        return safe_sql, holders
+
+    def _format_sorted_filter(self, filtr, id_field, modified_field, prefix,
+                              index):
+        """Format the field of the specified filter as in
+        :meth:`_format_sorting`, and its value as a placeholder.
+
+        :returns: A SQL string with placeholders for the field and for
+            the value, and a dict mapping placeholders to actual values.
+        :rtype: tuple
+        """
+        if filtr.field in (id_field, modified_field):
+            return self._format_filter(filtr, id_field, modified_field,
+                                       prefix, index)
+
+        field_holder = '%s_field_%s' % (prefix, index)
+        value_holder = '%s_value_%s' % (prefix, index)
+        holders = {field_holder: filtr.field}
+        sql_field = self._format_data_field(field_holder, typed=True)
+        sql_value = '%%(%s)s::JSONB' % value_holder
+        if filtr.value is not None:
+            holders[value_holder] = json.dumps(filtr.value)
+        return sql_field, sql_value, holders
+
+    def _extract_keyset(self, pagination_rules, id_field, modified_field):
+        """Detect if the pagination rules are the lexicographic expansion
+        of a keyset, i.e. for fields ``a``, ``b``, ``c``::
+
+            (a < x) OR (a = x AND b < y) OR (a = x AND b = y AND c < z)
+
+        with the same comparison operator (``LT`` or ``GT``) in every rule.
+
+        Since records that miss a field would not match a row comparison,
+        the rules on record fields are only expressed as such if the
+        comparison is ``LT`` (i.e. descending order, where missing values
+        come first) and if the fields of the keyset are not missing.
+
+        :returns: the list of filters of the keyset, in sorting order, or
+            ``None`` if the rules cannot be expressed as a row comparison.
+        :rtype: list of :class:`cliquet.storage.Filter`
+        """
+        rules = sorted(pagination_rules, key=len)
+        if not rules:
+            return None
+
+        longest = rules[-1]
+        if [len(rule) for rule in rules] != list(range(1, len(longest) + 1)):
+            return None
+
+        operator = longest[-1].operator
+        if operator not in (COMPARISON.LT, COMPARISON.GT):
+            return None
+
+        keyset = [(f.field, f.value) for f in longest]
+        data_values = [value for field, value in keyset
+                       if field not in (id_field, modified_field)]
+        if data_values and (operator != COMPARISON.LT or
+                            None in data_values):
+            return None
+
+        for rule in rules:
+            position = len(rule) - 1
+            equalities, comparison = rule[:-1], rule[-1]
+            if any([f.operator != COMPARISON.EQ for f in equalities]):
+                return None
+            if comparison.operator != operator:
+                return None
+            fields = [(f.field, f.value) for f in rule]
+            if fields != keyset[:position + 1]:
+                return None
+
+        return [Filter(field, value, operator) for field, value in keyset]
+
+    def _format_keyset(self, keyset, id_field, modified_field):
+        """Format the keyset filters as a single row-value comparison, with
+        placeholders for safe escaping.
+
+        :returns: A SQL string with placeholders, and a dict mapping
+            placeholders to actual values.
+        :rtype: tuple
+        """
+        sql_fields = []
+        sql_values = []
+        holders = {}
+        for i, filtr in enumerate(keyset):
+            # Use the exact same expressions as the sorting.
+            sql_field, sql_value, filter_holders = self._format_sorted_filter(
+                filtr, id_field, modified_field, 'keyset', i)
+            sql_fields.append(sql_field)
+            sql_values.append(sql_value)
+            holders.update(**filter_holders)
+
+        sql_operator = keyset[0].operator
+        safe_sql = '(%s) %s (%s)' % (', '.join(sql_fields),
+                                     sql_operator,
+                                     ', '.join(sql_values))
+        return safe_sql, holders
+
     def _format_sorting(self, sorting, id_field, modified_field):
         """Format the sorting in SQL, with placeholders for safe escaping.
 
@@ -714,7 +2281,7 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
             else:
                 field_holder = 'sort_field_%s' % i
                 holders[field_holder] = sort.field
-                sql_field = 'data->>%%(%s)s' % field_holder
+                sql_field = self._format_data_field(field_holder, typed=True)
 
             sql_direction = 'ASC' if sort.direction > 0 else 'DESC'
             sql_sort = "%s %s" % (sql_field, sql_direction)
@@ -733,21 +2300,125 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
         if for_creation and id_field in record:
             unique_fields = (unique_fields or tuple()) + (id_field,)
 
-        if not unique_fields:
+        conflicting = self._format_unicity(collection_id, parent_id, record,
+                                           unique_fields, id_field,
+                                           modified_field, for_creation)
+        if not conflicting:
+            return
+
+        # Load the conflicting record with the same cursor, since another
+        # connection (e.g. to a replica) may not see it yet.
+        query = """
+        SELECT id, last_modified, data
+          FROM records
+         WHERE %s
+         LIMIT 1;
+        """
+        sql, placeholders = conflicting
+        cursor.execute(query % sql, placeholders)
+        if cursor.rowcount > 0:
+            result = cursor.fetchone()
+            existing = result['data']
+            existing[id_field] = result['id']
+            existing[modified_field] = result['last_modified']
+            field = _conflicting_field(record, existing, unique_fields)
+            raise exceptions.UnicityError(field, existing)
+
+    def _check_unicity_many(self, cursor, collection_id, parent_id, records,
+                            unique_fields, id_field, modified_field,
+                            for_creation=False):
+        """Check that none of the specified records violates the resource
+        unicity rules, neither with existing records (in the current
+        transaction snapshot) nor with each other.
+        """
+        if for_creation:
+            # If id is provided by client, check that no record conflicts.
+            all_unique_fields = (unique_fields or tuple()) + (id_field,)
+        else:
+            all_unique_fields = unique_fields
+
+        if not all_unique_fields:
+            return
+
+        # Conflicts within the batch.
+        known = {}
+        for record in records:
+            keys = [(field, json.dumps(record[field]))
+                    for field in set(all_unique_fields)
+                    if record.get(field) is not None]
+            for key in keys:
+                other = known.get(key)
+                if other is None:
+                    continue
+                is_itself = other[id_field] == record[id_field]
+                if for_creation or not is_itself:
+                    field, _ = key
+                    raise exceptions.UnicityError(field, other)
+            for key in keys:
+                known[key] = record
+
+        # Conflicts with existing records, with a single query.
+        conditions = []
+        placeholders = {}
+        for i, record in enumerate(records):
+            conflicting = self._format_unicity(collection_id, parent_id,
+                                               record, all_unique_fields,
+                                               id_field, modified_field,
+                                               for_creation,
+                                               prefix='record_%s' % i)
+            if conflicting:
+                sql, holders = conflicting
+                conditions.append('(%s)' % sql)
+                placeholders.update(**holders)
+
+        if not conditions:
             return
 
         query = """
         SELECT id
           FROM records
-         WHERE parent_id = %%(parent_id)s
-           AND collection_id = %%(collection_id)s
-           AND (%(conditions_filter)s)
-           AND %(condition_record)s
+         WHERE %s
          LIMIT 1;
         """
+        cursor.execute(query % ' OR '.join(conditions), placeholders)
+        if cursor.rowcount > 0:
+            # Find out which record conflicts, and raise the error.
+            for record in records:
+                self._check_unicity(cursor, collection_id, parent_id, record,
+                                    unique_fields, id_field, modified_field,
+                                    for_creation)
+
+    def _format_unicity(self, collection_id, parent_id, record,
+                        unique_fields, id_field, modified_field,
+                        for_creation=False, prefix='unicity'):
+        """Format the conditions matching the existing records that would
+        violate the resource unicity rules, with placeholders for safe
+        escaping.
+
+        .. note::
+
+            Values are compared exactly, with the expression of the unique
+            indexes (i.e. ``"42"`` does not conflict with ``42``), along
+            with a containment that can be looked up in the GIN index on
+            ``data``.
+
+        :returns: A SQL string with placeholders, and a dict mapping
+            placeholders to actual values, or ``None`` if no record can
+            conflict.
+        :rtype: tuple
+        """
+        if not unique_fields:
+            return None
+
+        condition = """
+                parent_id = %%(unicity_parent_id)s
+            AND collection_id = %%(unicity_collection_id)s
+            AND (%(conditions_filter)s)
+            AND %(condition_record)s
+        """
         safeholders = dict()
-        placeholders = dict(parent_id=parent_id,
-                            collection_id=collection_id)
+        placeholders = dict(unicity_parent_id=parent_id,
+                            unicity_collection_id=collection_id)
 
         # Transform each field unicity into a query condition.
         filters = []
@@ -755,17 +2426,29 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
             value = record.get(field)
             if value is None:
                 continue
-            sql, holders = self._format_conditions(
-                [Filter(field, value, COMPARISON.EQ)],
-                id_field,
-                modified_field,
-                prefix=field)
+            field_prefix = '%s_%s' % (prefix, field)
+            if field == id_field:
+                sql, holders = self._format_conditions(
+                    [Filter(field, value, COMPARISON.EQ)],
+                    id_field,
+                    modified_field,
+                    prefix=field_prefix)
+            else:
+                field_holder = '%s_field_0' % field_prefix
+                value_holder = '%s_value_0' % field_prefix
+                contained_holder = '%s_contained_0' % field_prefix
+                sql_field = self._format_data_field(field_holder, typed=True)
+                sql = '(data @> %%(%s)s::JSONB AND %s = %%(%s)s::JSONB)' % (
+                    contained_holder, sql_field, value_holder)
+                holders = {field_holder: field,
+                           value_holder: json.dumps(value),
+                           contained_holder: json.dumps({field: value})}
             filters.append(sql)
             placeholders.update(**holders)
 
         # All unique fields are empty in record
         if not filters:
-            return
+            return None
 
         safeholders['conditions_filter'] = ' OR '.join(filters)
 
@@ -775,33 +2458,140 @@ class PostgreSQL(PostgreSQLClient, StorageBase):
             sql, holders = self._format_conditions(
                 [Filter(id_field, object_id, COMPARISON.NOT)],
                 id_field,
-                modified_field)
+                modified_field,
+                prefix='%s_exclude' % prefix)
             safeholders['condition_record'] = sql
             placeholders.update(**holders)
         else:
             safeholders['condition_record'] = 'TRUE'
 
-        cursor.execute(query % safeholders, placeholders)
-        if cursor.rowcount > 0:
-            result = cursor.fetchone()
-            existing = self.get(collection_id, parent_id, result['id'])
-            raise exceptions.UnicityError(unique_fields[0], existing)
+        return condition % safeholders, placeholders
 
 
-def load_from_config(config):
-    settings = config.get_settings()
+def _conflicting_field(record, existing, unique_fields):
+    """Return the first of the `unique_fields` whose value in `record` is
+    the same in the `existing` record.
+    """
+    for field in unique_fields:
+        value = record.get(field)
+        if value is not None and existing.get(field) == value:
+            return field
+    return unique_fields[0]
 
-    max_fetch_size = settings['storage_max_fetch_size']
-    pool_size = int(settings['storage_pool_size'])
-    uri = settings['storage_url']
-    uri = urlparse.urlparse(uri)
-    conn_kwargs = dict(pool_size=pool_size,
-                       host=uri.hostname,
+
+def _chunks(items, size):
+    """Split the specified list into lists of at most `size` items."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _as_epoch(timestamp):
+    """Return the milliseconds epoch integer of the specified UTC
+    `timestamp`, like the ``as_epoch()`` SQL function.
+    """
+    return calendar.timegm(timestamp.timetuple()) * 1000
+
+
+def _partition_bounds(timestamp, interval):
+    """Return the bounds of the `interval` period (``day``, ``week`` or
+    ``month``) that contains the specified `timestamp`.
+    """
+    start = datetime.datetime(timestamp.year, timestamp.month, timestamp.day)
+    if interval == 'day':
+        end = start + datetime.timedelta(days=1)
+    elif interval == 'week':
+        start -= datetime.timedelta(days=start.weekday())
+        end = start + datetime.timedelta(days=7)
+    else:
+        start = start.replace(day=1)
+        end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def _parse_url(url):
+    uri = urlparse.urlparse(url)
+    conn_kwargs = dict(host=uri.hostname,
                        port=uri.port,
                        user=uri.username,
                        password=uri.password,
                        database=uri.path[1:] if uri.path else '')
     # Filter specified values only, to preserve PostgreSQL defaults
-    conn_kwargs = dict([(k, v) for k, v in conn_kwargs.items() if v])
-    return PostgreSQL(max_fetch_size=int(max_fetch_size),
-                      **conn_kwargs)
+    return dict([(k, v) for k, v in conn_kwargs.items() if v])
+
+
+def load_from_config(config, url=None):
+    """Instantiate the storage from the configuration settings.
+
+    :param str url: Optionnally connect to this URL instead of
+        ``storage_url``, without replicas (e.g. for shards).
+    """
+    settings = config.get_settings()
+
+    max_fetch_size = settings['storage_max_fetch_size']
+    pool_size = int(settings['storage_pool_size'])
+    conn_kwargs = _parse_url(url or settings['storage_url'])
+    pool_timeout = settings.get('storage_pool_timeout')
+    if pool_timeout is not None:
+        conn_kwargs['pool_timeout'] = float(pool_timeout)
+
+    replicas_urls = []
+    if url is None:
+        replicas_urls = aslist(settings.get('storage_replica_urls', ''))
+    replicas = [_parse_url(url) for url in replicas_urls]
+    max_replica_lag = settings.get('storage_replica_max_lag')
+    if max_replica_lag not in (None, ''):
+        max_replica_lag = float(max_replica_lag)
+    else:
+        max_replica_lag = None
+
+    prepared_statements = settings.get('storage_prepared_statements', True)
+    partition_interval = settings.get('storage_deleted_partition_interval',
+                                      'month')
+    if partition_interval not in ('day', 'week', 'month'):
+        raise ValueError('Unknown partition interval %r' % partition_interval)
+    delete_batch_size = int(settings.get('storage_delete_batch_size', 0))
+    statement_timeout = int(settings['storage_statement_timeout_ms'])
+    request_timeout = int(settings['storage_request_timeout_ms'])
+    notifications_enabled = settings['storage_notifications_enabled']
+
+    storage = PostgreSQL(max_fetch_size=int(max_fetch_size),
+                         prepared_statements=asbool(prepared_statements),
+                         deleted_partition_interval=partition_interval,
+                         delete_batch_size=delete_batch_size,
+                         notifications_enabled=asbool(notifications_enabled),
+                         statement_timeout=statement_timeout or None,
+                         request_timeout=request_timeout or None,
+                         pool_size=pool_size,
+                         replicas=replicas,
+                         max_replica_lag=max_replica_lag,
+                         **conn_kwargs)
+
+    # Batch subrequests belong to their parent request, they must not reset
+    # its state (i.e. replicas routing and deadline).
+    def is_subrequest(request):
+        return getattr(request, 'parent', None) is not None
+
+    if replicas:
+        # Replicas are used again for reads once a new request starts, unless
+        # it is going to write: its reads (e.g. existing records, timestamps
+        # for preconditions) have to be consistent with its writes.
+        def forget_writes(event):
+            if is_subrequest(event.request):
+                return
+            if event.request.method in ('GET', 'HEAD', 'OPTIONS'):
+                storage.forget_writes()
+            else:
+                storage.use_primary()
+        config.add_subscriber(forget_writes, NewRequest)
+
+    if statement_timeout or request_timeout:
+        # Statements are limited during requests only (e.g. not migrations).
+        def limit_statements(event):
+            if is_subrequest(event.request):
+                return
+            storage.begin_request(msec_time())
+            event.request.add_finished_callback(
+                lambda request: storage.end_request())
+        config.add_subscriber(limit_statements, NewRequest)
+
+    return storage
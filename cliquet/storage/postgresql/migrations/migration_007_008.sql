@@ -0,0 +1,92 @@
+--
+-- Latest timestamp of every collection, maintained by triggers.
+--
+CREATE TABLE IF NOT EXISTS timestamps (
+    parent_id TEXT NOT NULL,
+    collection_id TEXT NOT NULL,
+    last_modified TIMESTAMP NOT NULL,
+
+    PRIMARY KEY (parent_id, collection_id)
+);
+
+-- Initialize with the latest timestamp of existing collections.
+INSERT INTO timestamps (parent_id, collection_id, last_modified)
+SELECT parent_id, collection_id, MAX(last_modified)
+  FROM (SELECT parent_id, collection_id, last_modified FROM records
+         UNION ALL
+        SELECT parent_id, collection_id, last_modified FROM deleted) AS t
+ GROUP BY parent_id, collection_id;
+
+
+--
+-- Helper that returns the current collection timestamp.
+--
+CREATE OR REPLACE FUNCTION collection_timestamp(uid VARCHAR, resource VARCHAR)
+RETURNS TIMESTAMP AS $$
+DECLARE
+    ts TIMESTAMP;
+BEGIN
+    --
+    -- This is a single primary key lookup, since the latest timestamp
+    -- of each collection is kept up-to-date by ``bump_timestamp()``.
+    --
+    SELECT last_modified INTO ts
+      FROM timestamps
+     WHERE parent_id = uid
+       AND collection_id = resource;
+
+    -- Latest timestamp or current if empty
+    RETURN coalesce(ts, localtimestamp);
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION bump_timestamp()
+RETURNS trigger AS $$
+DECLARE
+    current TIMESTAMP;
+BEGIN
+    --
+    -- This bumps the current timestamp to 1 msec after the previous one if
+    -- the current time is not at least 1 msec ahead of it (or if the previous
+    -- one was bumped already).
+    --
+    -- The collection row in ``timestamps`` is locked by the ``UPDATE`` until
+    -- the end of the transaction, so that concurrent writes on the same
+    -- collection obtain strictly increasing timestamps.
+    -- See https://github.com/mozilla-services/cliquet/issues/25
+    --
+    LOOP
+        UPDATE timestamps
+           SET last_modified = greatest(localtimestamp,
+                                        last_modified + INTERVAL '1 milliseconds')
+         WHERE parent_id = NEW.parent_id
+           AND collection_id = NEW.collection_id
+        RETURNING last_modified INTO current;
+
+        EXIT WHEN FOUND;
+
+        --
+        -- Empty collections have the current timestamp (see
+        -- ``collection_timestamp()``), hence bump it too.
+        --
+        BEGIN
+            INSERT INTO timestamps (parent_id, collection_id, last_modified)
+            VALUES (NEW.parent_id, NEW.collection_id,
+                    localtimestamp + INTERVAL '1 milliseconds')
+            RETURNING last_modified INTO current;
+            EXIT;
+        EXCEPTION WHEN unique_violation THEN
+            -- Inserted concurrently: loop to bump it instead.
+        END;
+    END LOOP;
+
+    NEW.last_modified := current;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '8');
@@ -0,0 +1,62 @@
+--
+-- Number of records of every collection, maintained by triggers.
+--
+CREATE TABLE IF NOT EXISTS collection_counts (
+    parent_id TEXT NOT NULL,
+    collection_id TEXT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (parent_id, collection_id)
+);
+
+-- Initialize with the number of records of existing collections.
+INSERT INTO collection_counts (parent_id, collection_id, count)
+SELECT parent_id, collection_id, COUNT(*)
+  FROM records
+ GROUP BY parent_id, collection_id;
+
+
+--
+-- Trigger to count records on INSERT/DELETE
+--
+DROP TRIGGER IF EXISTS tgr_records_count ON records;
+
+CREATE OR REPLACE FUNCTION count_records()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE collection_counts
+           SET count = count - 1
+         WHERE parent_id = OLD.parent_id
+           AND collection_id = OLD.collection_id;
+        RETURN OLD;
+    END IF;
+
+    LOOP
+        UPDATE collection_counts
+           SET count = count + 1
+         WHERE parent_id = NEW.parent_id
+           AND collection_id = NEW.collection_id;
+
+        EXIT WHEN FOUND;
+
+        BEGIN
+            INSERT INTO collection_counts (parent_id, collection_id, count)
+            VALUES (NEW.parent_id, NEW.collection_id, 1);
+            EXIT;
+        EXCEPTION WHEN unique_violation THEN
+            -- Inserted concurrently: loop to increment it instead.
+        END;
+    END LOOP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tgr_records_count
+AFTER INSERT OR DELETE ON records
+FOR EACH ROW EXECUTE PROCEDURE count_records();
+
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '10');
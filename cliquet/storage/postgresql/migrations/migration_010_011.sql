@@ -0,0 +1,107 @@
+--
+-- Bump the timestamp of a collection, and return it.
+--
+CREATE OR REPLACE FUNCTION bump_collection_timestamp(uid TEXT, resource TEXT)
+RETURNS TIMESTAMP AS $$
+DECLARE
+    current TIMESTAMP;
+BEGIN
+    --
+    -- This bumps the current timestamp to 1 msec after the previous one if
+    -- the current time is not at least 1 msec ahead of it (or if the previous
+    -- one was bumped already).
+    --
+    -- The collection row in ``timestamps`` is locked by the ``UPDATE`` until
+    -- the end of the transaction, so that concurrent writes on the same
+    -- collection obtain strictly increasing timestamps.
+    -- See https://github.com/mozilla-services/cliquet/issues/25
+    --
+    LOOP
+        UPDATE timestamps
+           SET last_modified = greatest(localtimestamp,
+                                        last_modified + INTERVAL '1 milliseconds')
+         WHERE parent_id = uid
+           AND collection_id = resource
+        RETURNING last_modified INTO current;
+
+        EXIT WHEN FOUND;
+
+        --
+        -- Empty collections have the current timestamp (see
+        -- ``collection_timestamp()``), hence bump it too.
+        --
+        BEGIN
+            INSERT INTO timestamps (parent_id, collection_id, last_modified)
+            VALUES (uid, resource, localtimestamp + INTERVAL '1 milliseconds')
+            RETURNING last_modified INTO current;
+            EXIT;
+        EXCEPTION WHEN unique_violation THEN
+            -- Inserted concurrently: loop to bump it instead.
+        END;
+    END LOOP;
+
+    RETURN current;
+END;
+$$ LANGUAGE plpgsql;
+
+--
+-- Triggers to set last_modified on INSERT/UPDATE
+--
+-- Tombstones are inserted with ``bump_collection_timestamp()`` directly,
+-- since rows of partitioned tables cannot be moved by ``BEFORE`` triggers.
+--
+DROP TRIGGER IF EXISTS tgr_deleted_last_modified ON deleted;
+
+CREATE OR REPLACE FUNCTION bump_timestamp()
+RETURNS trigger AS $$
+BEGIN
+    NEW.last_modified := bump_collection_timestamp(NEW.parent_id,
+                                                   NEW.collection_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+--
+-- Range-partition tombstones by ``last_modified`` (since PostgreSQL 11).
+--
+DO $$
+BEGIN
+    IF current_setting('server_version_num')::INTEGER >= 110000 AND
+       (SELECT relkind FROM pg_class WHERE oid = 'deleted'::regclass) = 'r' THEN
+        ALTER TABLE deleted RENAME TO deleted_unpartitioned;
+        ALTER TABLE deleted_unpartitioned DROP CONSTRAINT deleted_pkey;
+        DROP INDEX idx_deleted_parent_id_collection_id_last_modified;
+        DROP INDEX idx_deleted_last_modified_epoch;
+
+        EXECUTE '
+        CREATE TABLE deleted (
+            id TEXT NOT NULL,
+            parent_id TEXT NOT NULL,
+            collection_id TEXT NOT NULL,
+            last_modified TIMESTAMP NOT NULL,
+
+            PRIMARY KEY (id, parent_id, collection_id, last_modified)
+        ) PARTITION BY RANGE (last_modified)';
+        EXECUTE '
+        CREATE TABLE deleted_default
+        PARTITION OF deleted DEFAULT';
+
+        INSERT INTO deleted (id, parent_id, collection_id, last_modified)
+        SELECT id, parent_id, collection_id, last_modified
+          FROM deleted_unpartitioned;
+
+        DROP TABLE deleted_unpartitioned;
+    END IF;
+END;
+$$;
+
+DROP INDEX IF EXISTS idx_deleted_parent_id_collection_id_last_modified;
+CREATE UNIQUE INDEX idx_deleted_parent_id_collection_id_last_modified
+    ON deleted(parent_id, collection_id, last_modified DESC);
+DROP INDEX IF EXISTS idx_deleted_last_modified_epoch;
+CREATE INDEX idx_deleted_last_modified_epoch ON deleted(as_epoch(last_modified));
+
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '11');
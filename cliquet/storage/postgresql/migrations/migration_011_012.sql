@@ -0,0 +1,99 @@
+--
+-- Store ``last_modified`` as milliseconds epoch integers, instead of
+-- converting timestamps with ``as_epoch()`` in every query.
+--
+DROP INDEX IF EXISTS idx_records_last_modified_epoch;
+DROP INDEX IF EXISTS idx_deleted_last_modified_epoch;
+
+CREATE OR REPLACE FUNCTION bump_timestamp()
+RETURNS trigger AS $$
+BEGIN
+    NEW.last_modified := as_epoch(bump_collection_timestamp(NEW.parent_id,
+                                                            NEW.collection_id));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+--
+-- Create or update a record, in a single call.
+--
+CREATE OR REPLACE FUNCTION upsert_record(rid TEXT, pid TEXT, cid TEXT,
+                                         rdata JSONB)
+RETURNS BIGINT AS $$
+DECLARE
+    ts BIGINT;
+BEGIN
+    LOOP
+        UPDATE records SET data = rdata
+         WHERE id = rid
+           AND parent_id = pid
+           AND collection_id = cid
+        RETURNING last_modified INTO ts;
+
+        EXIT WHEN FOUND;
+
+        BEGIN
+            INSERT INTO records (id, parent_id, collection_id, data)
+            VALUES (rid, pid, cid, rdata)
+            RETURNING last_modified INTO ts;
+            EXIT;
+        EXCEPTION WHEN unique_violation THEN
+            -- Inserted concurrently: loop to update it instead.
+        END;
+    END LOOP;
+
+    RETURN ts;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE records
+    ALTER COLUMN last_modified TYPE BIGINT USING as_epoch(last_modified);
+
+--
+-- The partition key of a partitioned table cannot be altered: tombstones
+-- are copied into a new one. Partitions of periods are created again by
+-- ``cliquet expire-deleted``.
+--
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'deleted'::regclass) = 'p' THEN
+        CREATE TABLE deleted_epoch AS
+        SELECT id, parent_id, collection_id,
+               as_epoch(last_modified) AS last_modified
+          FROM deleted;
+
+        DROP TABLE deleted;
+
+        EXECUTE '
+        CREATE TABLE deleted (
+            id TEXT NOT NULL,
+            parent_id TEXT NOT NULL,
+            collection_id TEXT NOT NULL,
+            last_modified BIGINT NOT NULL,
+
+            PRIMARY KEY (id, parent_id, collection_id, last_modified)
+        ) PARTITION BY RANGE (last_modified)';
+        EXECUTE '
+        CREATE TABLE deleted_default
+        PARTITION OF deleted DEFAULT';
+
+        INSERT INTO deleted (id, parent_id, collection_id, last_modified)
+        SELECT id, parent_id, collection_id, last_modified
+          FROM deleted_epoch;
+
+        DROP TABLE deleted_epoch;
+    ELSE
+        ALTER TABLE deleted
+            ALTER COLUMN last_modified TYPE BIGINT
+            USING as_epoch(last_modified);
+    END IF;
+END;
+$$;
+
+DROP INDEX IF EXISTS idx_deleted_parent_id_collection_id_last_modified;
+CREATE UNIQUE INDEX idx_deleted_parent_id_collection_id_last_modified
+    ON deleted(parent_id, collection_id, last_modified DESC);
+
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '12');
@@ -0,0 +1,41 @@
+--
+-- Create or update a record, in a single call.
+--
+CREATE OR REPLACE FUNCTION upsert_record(rid TEXT, pid TEXT, cid TEXT,
+                                         rdata JSONB)
+RETURNS BIGINT AS $$
+DECLARE
+    ts BIGINT;
+    violated TEXT;
+BEGIN
+    LOOP
+        UPDATE records SET data = rdata
+         WHERE id = rid
+           AND parent_id = pid
+           AND collection_id = cid
+        RETURNING last_modified INTO ts;
+
+        EXIT WHEN FOUND;
+
+        BEGIN
+            INSERT INTO records (id, parent_id, collection_id, data)
+            VALUES (rid, pid, cid, rdata)
+            RETURNING last_modified INTO ts;
+            EXIT;
+        EXCEPTION WHEN unique_violation THEN
+            GET STACKED DIAGNOSTICS violated = CONSTRAINT_NAME;
+            -- Unique fields indexes (see ``initialize_indexes()``).
+            IF violated <> 'records_pkey' THEN
+                RAISE;
+            END IF;
+            -- Inserted concurrently: loop to update it instead.
+        END;
+    END LOOP;
+
+    RETURN ts;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '13');
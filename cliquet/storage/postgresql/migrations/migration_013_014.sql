@@ -0,0 +1,17 @@
+--
+-- Notify the changes of collections (see ``storage_notifications_enabled``),
+-- with a ``parent_id|collection_id|timestamp`` payload.
+--
+CREATE OR REPLACE FUNCTION notify_change()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('cliquet_changes',
+                      NEW.parent_id || '|' || NEW.collection_id || '|' ||
+                      NEW.last_modified);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Bump storage schema version.
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '14');
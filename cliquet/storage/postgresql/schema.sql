@@ -16,10 +16,9 @@ CREATE TABLE IF NOT EXISTS records (
     parent_id TEXT NOT NULL,
     collection_id TEXT NOT NULL,
 
-    -- Timestamp is relevant because adequate semantically.
-    -- Since the HTTP API manipulates integers, it could make sense
-    -- to replace the timestamp columns type by integer.
-    last_modified TIMESTAMP NOT NULL,
+    -- Milliseconds epoch integer, as manipulated by the HTTP API, set
+    -- by ``bump_timestamp()`` from the collection timestamp.
+    last_modified BIGINT NOT NULL,
 
     -- JSONB, 2x faster than JSON.
     data JSONB NOT NULL DEFAULT '{}'::JSONB,
@@ -30,26 +29,70 @@ CREATE TABLE IF NOT EXISTS records (
 DROP INDEX IF EXISTS idx_records_parent_id_collection_id_last_modified;
 CREATE UNIQUE INDEX idx_records_parent_id_collection_id_last_modified
     ON records(parent_id, collection_id, last_modified DESC);
-DROP INDEX IF EXISTS idx_records_last_modified_epoch;
-CREATE INDEX idx_records_last_modified_epoch ON records(as_epoch(last_modified));
 
 
 --
 -- Deleted records, without data.
 --
-CREATE TABLE IF NOT EXISTS deleted (
-    id TEXT NOT NULL,
+-- Since PostgreSQL 11, tombstones are range-partitioned by ``last_modified``,
+-- in order to expire them by dropping whole partitions (see
+-- ``cliquet.storage.postgresql.PostgreSQL.expire_deleted()``). Tombstones
+-- that do not fall in any partition are kept in ``deleted_default``.
+--
+DO $$
+BEGIN
+    IF current_setting('server_version_num')::INTEGER >= 110000 THEN
+        EXECUTE '
+        CREATE TABLE IF NOT EXISTS deleted (
+            id TEXT NOT NULL,
+            parent_id TEXT NOT NULL,
+            collection_id TEXT NOT NULL,
+            last_modified BIGINT NOT NULL,
+
+            PRIMARY KEY (id, parent_id, collection_id, last_modified)
+        ) PARTITION BY RANGE (last_modified)';
+        EXECUTE '
+        CREATE TABLE IF NOT EXISTS deleted_default
+        PARTITION OF deleted DEFAULT';
+    ELSE
+        CREATE TABLE IF NOT EXISTS deleted (
+            id TEXT NOT NULL,
+            parent_id TEXT NOT NULL,
+            collection_id TEXT NOT NULL,
+            last_modified BIGINT NOT NULL,
+
+            PRIMARY KEY (id, parent_id, collection_id)
+        );
+    END IF;
+END;
+$$;
+DROP INDEX IF EXISTS idx_deleted_parent_id_collection_id_last_modified;
+CREATE UNIQUE INDEX idx_deleted_parent_id_collection_id_last_modified
+    ON deleted(parent_id, collection_id, last_modified DESC);
+
+
+--
+-- Latest timestamp of every collection, maintained by triggers.
+--
+CREATE TABLE IF NOT EXISTS timestamps (
     parent_id TEXT NOT NULL,
     collection_id TEXT NOT NULL,
     last_modified TIMESTAMP NOT NULL,
 
-    PRIMARY KEY (id, parent_id, collection_id)
+    PRIMARY KEY (parent_id, collection_id)
+);
+
+
+--
+-- Number of records of every collection, maintained by triggers.
+--
+CREATE TABLE IF NOT EXISTS collection_counts (
+    parent_id TEXT NOT NULL,
+    collection_id TEXT NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (parent_id, collection_id)
 );
-DROP INDEX IF EXISTS idx_deleted_parent_id_collection_id_last_modified;
-CREATE UNIQUE INDEX idx_deleted_parent_id_collection_id_last_modified
-    ON deleted(parent_id, collection_id, last_modified DESC);
-DROP INDEX IF EXISTS idx_deleted_last_modified_epoch;
-CREATE INDEX idx_deleted_last_modified_epoch ON deleted(as_epoch(last_modified));
 
 
 --
@@ -58,60 +101,82 @@ CREATE INDEX idx_deleted_last_modified_epoch ON deleted(as_epoch(last_modified))
 CREATE OR REPLACE FUNCTION collection_timestamp(uid VARCHAR, resource VARCHAR)
 RETURNS TIMESTAMP AS $$
 DECLARE
-    ts_records TIMESTAMP;
-    ts_deleted TIMESTAMP;
+    ts TIMESTAMP;
 BEGIN
     --
-    -- This is fast because an index was created for ``parent_id``,
-    -- ``collection_id``, and ``last_modified`` with descending sorting order.
+    -- This is a single primary key lookup, since the latest timestamp
+    -- of each collection is kept up-to-date by ``bump_timestamp()``.
     --
-    SELECT last_modified INTO ts_records
-      FROM records
-     WHERE parent_id = uid
-       AND collection_id = resource
-     ORDER BY last_modified DESC LIMIT 1;
-
-    SELECT last_modified INTO ts_deleted
-      FROM deleted
+    SELECT last_modified INTO ts
+      FROM timestamps
      WHERE parent_id = uid
-       AND collection_id = resource
-     ORDER BY last_modified DESC LIMIT 1;
+       AND collection_id = resource;
 
-    -- Latest of records/deleted or current if empty
-    RETURN coalesce(greatest(ts_deleted, ts_records), localtimestamp);
+    -- Latest timestamp or current if empty
+    RETURN coalesce(ts, localtimestamp);
 END;
 $$ LANGUAGE plpgsql;
 
 --
--- Triggers to set last_modified on INSERT/UPDATE
+-- Bump the timestamp of a collection, and return it.
 --
-DROP TRIGGER IF EXISTS tgr_records_last_modified ON records;
-DROP TRIGGER IF EXISTS tgr_deleted_last_modified ON deleted;
-
-CREATE OR REPLACE FUNCTION bump_timestamp()
-RETURNS trigger AS $$
+CREATE OR REPLACE FUNCTION bump_collection_timestamp(uid TEXT, resource TEXT)
+RETURNS TIMESTAMP AS $$
 DECLARE
-    previous TIMESTAMP;
     current TIMESTAMP;
 BEGIN
     --
-    -- This bumps the current timestamp to 1 msec in the future if the previous
-    -- timestamp is equal to the current one (or higher if was bumped already).
+    -- This bumps the current timestamp to 1 msec after the previous one if
+    -- the current time is not at least 1 msec ahead of it (or if the previous
+    -- one was bumped already).
     --
-    -- If a bunch of requests from the same user on the same collection
-    -- arrive in the same millisecond, the unicity constraint can raise
-    -- an error (operation is cancelled).
+    -- The collection row in ``timestamps`` is locked by the ``UPDATE`` until
+    -- the end of the transaction, so that concurrent writes on the same
+    -- collection obtain strictly increasing timestamps.
     -- See https://github.com/mozilla-services/cliquet/issues/25
     --
-    previous := collection_timestamp(NEW.parent_id, NEW.collection_id);
-    current := localtimestamp;
+    LOOP
+        UPDATE timestamps
+           SET last_modified = greatest(localtimestamp,
+                                        last_modified + INTERVAL '1 milliseconds')
+         WHERE parent_id = uid
+           AND collection_id = resource
+        RETURNING last_modified INTO current;
 
-    IF previous >= current THEN
-        current := previous + INTERVAL '1 milliseconds';
-    END IF;
+        EXIT WHEN FOUND;
+
+        --
+        -- Empty collections have the current timestamp (see
+        -- ``collection_timestamp()``), hence bump it too.
+        --
+        BEGIN
+            INSERT INTO timestamps (parent_id, collection_id, last_modified)
+            VALUES (uid, resource, localtimestamp + INTERVAL '1 milliseconds')
+            RETURNING last_modified INTO current;
+            EXIT;
+        EXCEPTION WHEN unique_violation THEN
+            -- Inserted concurrently: loop to bump it instead.
+        END;
+    END LOOP;
+
+    RETURN current;
+END;
+$$ LANGUAGE plpgsql;
 
-    NEW.last_modified := current;
+--
+-- Triggers to set last_modified on INSERT/UPDATE
+--
+-- Tombstones are inserted with ``bump_collection_timestamp()`` directly,
+-- since rows of partitioned tables cannot be moved by ``BEFORE`` triggers.
+--
+DROP TRIGGER IF EXISTS tgr_records_last_modified ON records;
+DROP TRIGGER IF EXISTS tgr_deleted_last_modified ON deleted;
 
+CREATE OR REPLACE FUNCTION bump_timestamp()
+RETURNS trigger AS $$
+BEGIN
+    NEW.last_modified := as_epoch(bump_collection_timestamp(NEW.parent_id,
+                                                            NEW.collection_id));
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
@@ -120,9 +185,98 @@ CREATE TRIGGER tgr_records_last_modified
 BEFORE INSERT OR UPDATE ON records
 FOR EACH ROW EXECUTE PROCEDURE bump_timestamp();
 
-CREATE TRIGGER tgr_deleted_last_modified
-BEFORE INSERT OR UPDATE ON deleted
-FOR EACH ROW EXECUTE PROCEDURE bump_timestamp();
+--
+-- Trigger to count records on INSERT/DELETE
+--
+DROP TRIGGER IF EXISTS tgr_records_count ON records;
+
+CREATE OR REPLACE FUNCTION count_records()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE collection_counts
+           SET count = count - 1
+         WHERE parent_id = OLD.parent_id
+           AND collection_id = OLD.collection_id;
+        RETURN OLD;
+    END IF;
+
+    LOOP
+        UPDATE collection_counts
+           SET count = count + 1
+         WHERE parent_id = NEW.parent_id
+           AND collection_id = NEW.collection_id;
+
+        EXIT WHEN FOUND;
+
+        BEGIN
+            INSERT INTO collection_counts (parent_id, collection_id, count)
+            VALUES (NEW.parent_id, NEW.collection_id, 1);
+            EXIT;
+        EXCEPTION WHEN unique_violation THEN
+            -- Inserted concurrently: loop to increment it instead.
+        END;
+    END LOOP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tgr_records_count
+AFTER INSERT OR DELETE ON records
+FOR EACH ROW EXECUTE PROCEDURE count_records();
+
+--
+-- Notify the changes of collections (see ``storage_notifications_enabled``),
+-- with a ``parent_id|collection_id|timestamp`` payload.
+--
+CREATE OR REPLACE FUNCTION notify_change()
+RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('cliquet_changes',
+                      NEW.parent_id || '|' || NEW.collection_id || '|' ||
+                      NEW.last_modified);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+--
+-- Create or update a record, in a single call.
+--
+CREATE OR REPLACE FUNCTION upsert_record(rid TEXT, pid TEXT, cid TEXT,
+                                         rdata JSONB)
+RETURNS BIGINT AS $$
+DECLARE
+    ts BIGINT;
+    violated TEXT;
+BEGIN
+    LOOP
+        UPDATE records SET data = rdata
+         WHERE id = rid
+           AND parent_id = pid
+           AND collection_id = cid
+        RETURNING last_modified INTO ts;
+
+        EXIT WHEN FOUND;
+
+        BEGIN
+            INSERT INTO records (id, parent_id, collection_id, data)
+            VALUES (rid, pid, cid, rdata)
+            RETURNING last_modified INTO ts;
+            EXIT;
+        EXCEPTION WHEN unique_violation THEN
+            GET STACKED DIAGNOSTICS violated = CONSTRAINT_NAME;
+            -- Unique fields indexes (see ``initialize_indexes()``).
+            IF violated <> 'records_pkey' THEN
+                RAISE;
+            END IF;
+            -- Inserted concurrently: loop to update it instead.
+        END;
+    END LOOP;
+
+    RETURN ts;
+END;
+$$ LANGUAGE plpgsql;
 
 --
 -- Metadata table
@@ -136,4 +290,4 @@ INSERT INTO metadata (name, value) VALUES ('created_at', NOW()::TEXT);
 
 -- Set storage schema version.
 -- Should match ``cliquet.storage.postgresql.PostgreSQL.schema_version``
-INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '7');
+INSERT INTO metadata (name, value) VALUES ('storage_schema_version', '14');
@@ -67,8 +67,20 @@ class Redis(MemoryBasedStorage):
             return int(timestamp)
         return self._bump_timestamp(collection_id, parent_id)
 
-    @wrap_redis_error
     def _bump_timestamp(self, collection_id, parent_id):
+        return self._bump_timestamps(collection_id, parent_id, 1)[0]
+
+    @wrap_redis_error
+    def _bump_timestamps(self, collection_id, parent_id, count):
+        """Bump the collection timestamp once for `count` records, in a
+        single transaction.
+
+        The records timestamps are the latest milliseconds since the
+        previous collection timestamp, so that the collection timestamp is
+        not set in the future unless the records outnumber them.
+
+        :returns: the list of strictly increasing timestamps.
+        """
         key = '{0}.{1}.timestamp'.format(collection_id, parent_id)
         while 1:
             with self._client.pipeline() as pipe:
@@ -78,11 +90,14 @@ class Redis(MemoryBasedStorage):
                     pipe.multi()
                     current = utils.msec_time()
 
-                    if previous and int(previous) >= current:
-                        current = int(previous) + 1
-                    pipe.set(key, current)
+                    previous = int(previous) if previous else 0
+                    if previous >= current:
+                        current = previous + 1
+                    first = max(previous + 1, current - count + 1)
+                    timestamps = list(range(first, first + count))
+                    pipe.set(key, timestamps[-1])
                     pipe.execute()
-                    return current
+                    return timestamps
                 except redis.WatchError:  # pragma: no cover
                     # Our timestamp has been modified by someone else, let's
                     # retry.
@@ -120,6 +135,26 @@ class Redis(MemoryBasedStorage):
 
         return record
 
+    @wrap_redis_error
+    def create_many(self, collection_id, parent_id, records,
+                    id_generator=None, unique_fields=None,
+                    id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        id_generator = id_generator or self.id_generator
+        records = [record.copy() for record in records]
+        for record in records:
+            record.setdefault(id_field, id_generator())
+
+        self.check_unicity_many(collection_id, parent_id, records,
+                                unique_fields=unique_fields,
+                                id_field=id_field,
+                                for_creation=True)
+
+        self._store_many(collection_id, parent_id, records,
+                         id_field=id_field, modified_field=modified_field)
+        return records
+
     @wrap_redis_error
     def get(self, collection_id, parent_id, object_id,
             id_field=DEFAULT_ID_FIELD,
@@ -163,6 +198,46 @@ class Redis(MemoryBasedStorage):
 
         return record
 
+    @wrap_redis_error
+    def update_many(self, collection_id, parent_id, records,
+                    unique_fields=None, id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD,
+                    auth=None):
+        records = [record.copy() for record in records]
+
+        self.check_unicity_many(collection_id, parent_id, records,
+                                unique_fields=unique_fields,
+                                id_field=id_field)
+
+        self._store_many(collection_id, parent_id, records,
+                         id_field=id_field, modified_field=modified_field)
+        return records
+
+    def _store_many(self, collection_id, parent_id, records,
+                    id_field=DEFAULT_ID_FIELD,
+                    modified_field=DEFAULT_MODIFIED_FIELD):
+        """Set the timestamps of the specified records, and write them
+        in a single pipeline.
+        """
+        if not records:
+            return
+
+        timestamps = self._bump_timestamps(collection_id, parent_id,
+                                           len(records))
+        with self._client.pipeline() as multi:
+            for record, timestamp in zip(records, timestamps):
+                record[modified_field] = timestamp
+                record_id = record[id_field]
+                record_key = '{0}.{1}.{2}.records'.format(collection_id,
+                                                          parent_id,
+                                                          record_id)
+                multi.set(record_key, self._encode(record))
+                multi.sadd(
+                    '{0}.{1}.records'.format(collection_id, parent_id),
+                    record_id
+                )
+            multi.execute()
+
     @wrap_redis_error
     def delete(self, collection_id, parent_id, object_id,
                id_field=DEFAULT_ID_FIELD, with_deleted=True,
@@ -241,13 +316,35 @@ class Redis(MemoryBasedStorage):
         number_deleted = len(to_remove)
         return number_deleted
 
+    @wrap_redis_error
+    def expire_deleted(self, before, auth=None):
+        # Tombstones are stored in ``{collection}.{parent}.{id}.deleted``
+        # keys, and listed in ``{collection}.{parent}.deleted`` sets.
+        for key in self._client.scan_iter(match='*.deleted'):
+            if self._client.type(key) != b'string':
+                continue
+            encoded_item = self._client.get(key)
+            if encoded_item is None:
+                continue
+            deleted = self._decode(encoded_item)
+            if deleted[DEFAULT_MODIFIED_FIELD] >= before:
+                continue
+            key = key.decode('utf-8')
+            suffix = '.{0}.deleted'.format(deleted[DEFAULT_ID_FIELD])
+            deleted_ids = key[:-len(suffix)] + '.deleted'
+            with self._client.pipeline() as pipe:
+                pipe.delete(key)
+                pipe.srem(deleted_ids, deleted[DEFAULT_ID_FIELD])
+                pipe.execute()
+
     @wrap_redis_error
     def get_all(self, collection_id, parent_id, filters=None, sorting=None,
                 pagination_rules=None, limit=None, include_deleted=False,
                 id_field=DEFAULT_ID_FIELD,
                 modified_field=DEFAULT_MODIFIED_FIELD,
                 deleted_field=DEFAULT_DELETED_FIELD,
-                auth=None):
+                auth=None, raw=False):
+        # Records are kept decoded: the ``raw`` hint is ignored.
         records_ids_key = '{0}.{1}.records'.format(collection_id, parent_id)
         ids = self._client.smembers(records_ids_key)
 
@@ -38,6 +38,22 @@ class CreateTest(BaseTest):
         self.assertIn('field', record)
 
 
+class BulkTest(BaseTest):
+    def test_create_records_stores_every_records(self):
+        records = self.collection.create_records([{'field': 'a'},
+                                                  {'field': 'b'}])
+        retrieved, count = self.collection.get_records()
+        self.assertEqual(count, 2)
+        self.assertEqual(sorted(retrieved, key=lambda r: r['field']), records)
+
+    def test_update_records_stores_every_records(self):
+        record = self.collection.create_record({'field': 'a'})
+        record['field'] = 'b'
+        updated = self.collection.update_records([record])
+        retrieved = self.collection.get_record(record['id'])
+        self.assertEqual(retrieved, updated[0])
+
+
 class DeleteCollectionTest(BaseTest):
     def setUp(self):
         super(DeleteCollectionTest, self).setUp()
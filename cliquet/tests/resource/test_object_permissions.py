@@ -148,6 +148,45 @@ class SpecifyRecordPermissionTest(PermissionTest):
                          ['basicauth:userid', 'jean-louis'])
 
 
+class BulkRecordPermissionTest(PermissionTest):
+    def setUp(self):
+        super(BulkRecordPermissionTest, self).setUp()
+        self.collection = self.resource.collection
+        self.collection.current_principal = 'basicauth:userid'
+        self.resource.context.object_uri = '/articles'
+
+    def test_write_permission_is_given_to_creator_on_bulk_create(self):
+        perms = {'read': ['fxa:user']}
+        records = self.collection.create_records([
+            {'field': 'a', '__permissions__': perms}, {'field': 'b'}])
+        self.assertEqual(sorted(records[0]['__permissions__']['read']),
+                         ['fxa:user'])
+        for record in records:
+            perm_id = self.collection.get_permission_object_id(record['id'])
+            writers = self.permission.object_permissions(perm_id)['write']
+            self.assertEqual(sorted(writers), ['basicauth:userid'])
+
+    def test_permissions_are_not_stored_in_records_on_bulk_create(self):
+        records = self.collection.create_records([
+            {'field': 'a', '__permissions__': {'read': ['fxa:user']}}])
+        stored, _ = self.storage.get_all(
+            collection_id=self.collection.collection_id,
+            parent_id=self.collection.parent_id)
+        self.assertNotIn('__permissions__', stored[0])
+        self.assertEqual(stored[0]['id'], records[0]['id'])
+
+    def test_permissions_are_modified_on_bulk_update(self):
+        record = self.collection.create_record({'field': 'a'})
+        perm_id = self.collection.get_permission_object_id(record['id'])
+        self.permission.add_principal_to_ace(perm_id, 'read', 'fxa:user')
+        record = dict(record, __permissions__={'write': ['jean-louis']})
+        updated = self.collection.update_records([record])
+        permissions = updated[0]['__permissions__']
+        self.assertEqual(sorted(permissions['read']), ['fxa:user'])
+        self.assertEqual(sorted(permissions['write']),
+                         ['basicauth:userid', 'jean-louis'])
+
+
 class DeletedRecordPermissionTest(PermissionTest):
     def setUp(self):
         super(DeletedRecordPermissionTest, self).setUp()
@@ -6,7 +6,7 @@ from six.moves.urllib.parse import parse_qs, urlparse
 from pyramid.httpexceptions import HTTPBadRequest
 
 from cliquet.tests.resource import BaseTest
-from cliquet.utils import json
+from cliquet.utils import json, RawJSON
 
 
 class PaginationTest(BaseTest):
@@ -55,6 +55,49 @@ class PaginationTest(BaseTest):
             result = self.resource.collection_get()
             self.assertEqual(len(result['data']), 5)
 
+    def test_records_are_obtained_as_raw_json_if_passthrough_enabled(self):
+        with mock.patch.dict(self.resource.request.registry.settings, [
+                ('json_passthrough_enabled', 'true')]):
+            with mock.patch.object(self.collection, 'get_records',
+                                   return_value=([], 0)) as mocked:
+                self.resource.collection_get()
+        self.assertTrue(mocked.call_args[1]['raw'])
+
+    def test_records_are_decoded_if_get_records_is_overridden(self):
+        class PostProcessed(self.collection.__class__):
+            def get_records(self, *args, **kwargs):
+                records, count = super(PostProcessed, self).get_records(
+                    *args, **kwargs)
+                return [dict(r, seen=True) for r in records], count
+
+        self.collection.__class__ = PostProcessed
+        with mock.patch.dict(self.resource.request.registry.settings, [
+                ('json_passthrough_enabled', 'true')]):
+            with mock.patch.object(self.storage, 'get_all',
+                                   wraps=self.storage.get_all) as mocked:
+                result = self.resource.collection_get()
+        self.assertFalse(mocked.call_args[1]['raw'])
+        self.assertTrue(all([r['seen'] for r in result['data']]))
+
+    def test_next_page_can_be_built_from_raw_json_records(self):
+        get_all = self.storage.get_all
+
+        def raw_get_all(*args, **kwargs):
+            kwargs.pop('raw')
+            records, count = get_all(*args, **kwargs)
+            return [RawJSON(json.dumps(r)) for r in records], count
+
+        with mock.patch.dict(self.resource.request.registry.settings, [
+                ('json_passthrough_enabled', 'true')]):
+            with mock.patch.object(self.storage, 'get_all',
+                                   side_effect=raw_get_all):
+                self.resource.request.GET = {'_limit': '10'}
+                first = self.resource.collection_get()['data']
+                self._setup_next_page()
+                second = self.resource.collection_get()['data']
+        ids = set([json.loads(r)['id'] for r in first + second])
+        self.assertEqual(len(ids), 20)
+
     def test_return_next_page_url_is_given_in_headers(self):
         self.resource.request.GET = {'_limit': '10'}
         self.resource.collection_get()
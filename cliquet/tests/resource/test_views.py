@@ -639,6 +639,17 @@ class StorageErrorTest(BaseWebTest, unittest.TestCase):
                 self.assertTrue(mocked.called)
                 self.assertEqual(type(mocked.call_args[0][0]), ValueError)
 
+    def test_backend_timeouts_are_served_as_503_with_retry_after(self):
+        body = {'data': MINIMALIST_RECORD}
+        error = storage_exceptions.BackendTimeout(ValueError())
+        with mock.patch('cliquet.storage.redis.Redis.create',
+                        side_effect=error):
+            resp = self.app.post_json(self.collection_url,
+                                      body,
+                                      headers=self.headers,
+                                      status=503)
+        self.assertIn('Retry-After', resp.headers)
+
 
 class PaginationNextURLTest(BaseWebTest, unittest.TestCase):
     """Extra tests for `cliquet.tests.resource.test_pagination`
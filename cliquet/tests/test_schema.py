@@ -61,6 +61,11 @@ class ResourceSchemaTest(unittest.TestCase):
         deserialized = schema_instance.deserialize({'foo': 'bar'})
         self.assertNotIn('foo', deserialized)
 
+    def test_no_field_is_indexed_by_default(self):
+        schema_instance = schema.ResourceSchema()
+        indexed = schema_instance.get_option('indexed_fields')
+        self.assertEqual(indexed, tuple())
+
 
 class PermissionsSchemaTest(unittest.TestCase):
 
@@ -1,5 +1,6 @@
 import mock
 
+from cliquet import resource
 from cliquet.scripts import cliquet as cliquet_script
 
 from .support import unittest
@@ -27,3 +28,60 @@ class InitSchemaTest(unittest.TestCase):
         self.assertTrue(self.registry.storage.initialize_schema.called)
         self.assertTrue(self.registry.cache.initialize_schema.called)
         self.assertTrue(self.registry.permission.initialize_schema.called)
+
+    def test_migrate_initializes_indexes_of_registered_resources(self):
+        class IndexedSchema(resource.ResourceSchema):
+            class Options:
+                indexed_fields = ('name', 'age')
+
+        class Kitten(resource.BaseResource):
+            mapping = IndexedSchema()
+
+        class Puppy(resource.BaseResource):
+            pass
+
+        self.registry.cornice_services = {
+            '/kittens': mock.Mock(type='collection', resource=Kitten),
+            '/kittens/{id}': mock.Mock(type='record', resource=Kitten),
+            '/puppies': mock.Mock(type='collection', resource=Puppy),
+            '/__heartbeat__': mock.Mock(spec=[]),
+        }
+        self.run_command('migrate')
+        self.registry.storage.initialize_indexes.assert_called_with(
+            {'kitten': ('name', 'age')}, unique_fields={})
+
+    def test_migrate_initializes_unique_fields_of_registered_resources(self):
+        class UniqueSchema(resource.ResourceSchema):
+            class Options:
+                unique_fields = ('email',)
+
+        class Kitten(resource.BaseResource):
+            mapping = UniqueSchema()
+
+        self.registry.cornice_services = {
+            '/kittens': mock.Mock(type='collection', resource=Kitten),
+        }
+        self.run_command('migrate')
+        self.registry.storage.initialize_indexes.assert_called_with(
+            {}, unique_fields={'kitten': ('email',)})
+
+    def test_expire_deleted_purges_tombstones_older_than_days(self):
+        with mock.patch('cliquet.scripts.cliquet.msec_time') as msec_time:
+            msec_time.return_value = 10 * 24 * 3600 * 1000
+            with mock.patch('cliquet.scripts.cliquet.sys') as sys_mocked:
+                sys_mocked.argv = ['prog', '--ini', 'foo.ini',
+                                   'expire-deleted', '--days', '7']
+                with mock.patch('cliquet.scripts.cliquet.bootstrap') as boot:
+                    boot.return_value = {'registry': self.registry}
+                    cliquet_script.main()
+        self.registry.storage.expire_deleted.assert_called_with(
+            before=3 * 24 * 3600 * 1000)
+
+    def test_rebalance_shards_can_be_limited_to_one_parent(self):
+        with mock.patch('cliquet.scripts.cliquet.sys') as sys_mocked:
+            sys_mocked.argv = ['prog', '--ini', 'foo.ini',
+                               'rebalance-shards', '--parent-id', 'bob']
+            with mock.patch('cliquet.scripts.cliquet.bootstrap') as boot:
+                boot.return_value = {'registry': self.registry}
+                cliquet_script.main()
+        self.registry.storage.rebalance.assert_called_with(parent_id='bob')
@@ -48,6 +48,11 @@ class StatsdClientTest(unittest.TestCase):
             self.client.count('click')
             mocked_client.incr.assert_called_with('click', count=1)
 
+    def test_gauge_sets_the_value_of_key(self):
+        with mock.patch.object(self.client, '_client') as mocked_client:
+            self.client.gauge('connections', 3)
+            mocked_client.gauge.assert_called_with('connections', 3)
+
     def test_count_with_unique_uses_sets_for_key(self):
         with mock.patch.object(self.client, '_client') as mocked_client:
             self.client.count('click', unique='menu')
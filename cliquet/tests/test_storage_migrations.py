@@ -42,9 +42,15 @@ class PostgresqlStorageMigrationTest(unittest.TestCase):
         DROP TABLE IF EXISTS records CASCADE;
         DROP TABLE IF EXISTS deleted CASCADE;
         DROP TABLE IF EXISTS metadata CASCADE;
+        DROP TABLE IF EXISTS timestamps CASCADE;
+        DROP TABLE IF EXISTS collection_counts CASCADE;
         DROP FUNCTION IF EXISTS resource_timestamp(VARCHAR, VARCHAR);
         DROP FUNCTION IF EXISTS collection_timestamp(VARCHAR, VARCHAR);
         DROP FUNCTION IF EXISTS bump_timestamp();
+        DROP FUNCTION IF EXISTS bump_collection_timestamp(TEXT, TEXT);
+        DROP FUNCTION IF EXISTS upsert_record(TEXT, TEXT, TEXT, JSONB);
+        DROP FUNCTION IF EXISTS count_records();
+        DROP FUNCTION IF EXISTS notify_change();
         """
         with self.storage.connect() as cursor:
             cursor.execute(q)
@@ -53,6 +59,17 @@ class PostgresqlStorageMigrationTest(unittest.TestCase):
         version = self.storage._get_installed_version()
         self.assertEqual(version, self.version)
 
+    def test_schema_versions_are_compared_as_numbers(self):
+        with self.storage.connect() as cursor:
+            q = """
+            DELETE FROM metadata WHERE name = 'storage_schema_version';
+            INSERT INTO metadata (name, value)
+            VALUES ('storage_schema_version', '9'),
+                   ('storage_schema_version', %(version)s);
+            """
+            cursor.execute(q, dict(version=str(self.version)))
+        self.assertEqual(self.storage._get_installed_version(), self.version)
+
     def test_schema_is_not_recreated_from_scratch_if_already_exists(self):
         mocked = self.sql_execute_patcher.start()
         self.storage.initialize_schema()
@@ -8,7 +8,8 @@ import six
 
 from cliquet.utils import (
     native_value, strip_whitespace, random_bytes_hex, read_env,
-    current_service, encode_header, decode_header
+    current_service, encode_header, decode_header, json, json_serializer,
+    RawJSON
 )
 
 from .support import unittest, DummyRequest
@@ -152,3 +153,24 @@ class DecodeHeaderTest(unittest.TestCase):
         entry = 'Rémy'.encode('latin-1')
         value = decode_header(entry, 'latin-1')
         self.assertEqual(type(value), six.text_type)
+
+
+class JSONSerializerTest(unittest.TestCase):
+
+    def test_returns_same_output_as_json_dumps_for_decoded_values(self):
+        value = {'data': [{'id': 'abc', 'title': 'Rémy'}]}
+        self.assertEqual(json_serializer(value), json.dumps(value))
+
+    def test_writes_raw_json_of_lists_as_is(self):
+        value = {'data': [RawJSON('{"id":"abc"}'), RawJSON('{"id": "d"}')]}
+        serialized = json_serializer(value)
+        self.assertEqual(serialized, '{"data":[{"id":"abc"},{"id": "d"}]}')
+
+    def test_writes_raw_json_values_as_is(self):
+        value = {'data': RawJSON('{"id":"abc"}')}
+        self.assertEqual(json_serializer(value), '{"data":{"id":"abc"}}')
+
+    def test_result_can_be_decoded(self):
+        value = {'data': [RawJSON('{"title":"R\\u00e9my"}')], 'n': 1}
+        decoded = json.loads(json_serializer(value))
+        self.assertEqual(decoded, {'data': [{'title': 'Rémy'}], 'n': 1})
@@ -283,3 +283,42 @@ def strip_uri_prefix(path):
     Remove potential version prefix in URI.
     """
     return re.sub(r'^(/v\d+)?', '', six.text_type(path))
+
+
+class RawJSON(six.text_type):
+    """A string of already encoded JSON, which is written as is in responses
+    instead of being encoded again (see :func:`json_serializer`).
+    """
+
+
+def _contains_raw_json(value):
+    if isinstance(value, RawJSON):
+        return True
+    # Lists of records are homogeneous: look at the first item only.
+    return isinstance(value, list) and len(value) > 0 and \
+        isinstance(value[0], RawJSON)
+
+
+def json_serializer(value, **kwargs):
+    """Serialize the specified value in JSON.
+
+    Unlike ``json.dumps()``, the :class:`RawJSON` strings contained in the
+    value (or in its lists and top-level attributes) are inserted as is,
+    without being decoded and encoded again.
+
+    :rtype: str
+    """
+    if isinstance(value, RawJSON):
+        return six.text_type(value)
+
+    if isinstance(value, list) and _contains_raw_json(value):
+        items = [json_serializer(item) for item in value]
+        return u'[%s]' % u','.join(items)
+
+    if isinstance(value, dict):
+        if any([_contains_raw_json(v) for v in value.values()]):
+            members = [u'%s:%s' % (json.dumps(k), json_serializer(v))
+                       for k, v in value.items()]
+            return u'{%s}' % u','.join(members)
+
+    return json.dumps(value)
@@ -98,6 +98,11 @@ def error(context, request):
     if isinstance(context, httpexceptions.Response):
         return reapply_cors(request, context)
 
+    if isinstance(context, storage_exceptions.BackendTimeout):
+        logger.warning(context)
+        response = httpexceptions.HTTPServiceUnavailable()
+        return service_unavailable(response, request)
+
     if isinstance(context, storage_exceptions.BackendError):
         logger.critical(context.original, exc_info=True)
         response = httpexceptions.HTTPServiceUnavailable()